@@ -0,0 +1,139 @@
+# File: api/async_weather_api.py
+
+import asyncio
+import logging
+import httpx
+from cachetools.keys import hashkey
+from api.geocoding import geocoder
+from api.weather_store import weather_store, history_window
+from api.weather_api import (
+    forecast_base_url, archive_base_url, forecast_cache, hourly_forecast_cache, historical_cache, current_weather_cache,
+    forecast_params, parse_forecast, hourly_forecast_params, archive_params, parse_historical,
+    current_weather_params, parse_current_weather
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _method_key(self, *args, **kwargs):
+    """Cache key that ignores ``self`` so sync and async clients share entries."""
+    return hashkey(*args, **kwargs)
+
+class AsyncWeatherAPI:
+    """
+    Non-blocking counterpart of ``WeatherAPI`` for use inside ``async def`` endpoints.
+
+    All calls share one pooled ``httpx.AsyncClient``; a semaphore caps in-flight upstream
+    requests, and transport errors or retryable status codes are retried with exponential
+    backoff. Results go into the same single-flight caches as the synchronous ``WeatherAPI``.
+    The base URLs default to the ``OPEN_METEO_*_URL`` environment variables at construction;
+    ``transport`` replaces the network, e.g. with an ``httpx.MockTransport`` in tests.
+    """
+    def __init__(self, forecast_url=None, archive_url=None, timeout=30.0, max_connections=20,
+                 max_concurrency=10, max_retries=3, backoff_base=0.5, transport=None):
+        self.forecast_url = forecast_url or forecast_base_url()
+        self.archive_url = archive_url or archive_base_url()
+        self.transport = transport
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, url, params, timeout=None):
+        """GETs JSON from ``url``, retrying transient failures with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self.client.get(url, params=params, timeout=timeout or self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning(f"Weather API returned {response.status_code}, retrying (attempt {attempt + 1})")
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Weather API transport error: {e}, retrying (attempt {attempt + 1})")
+            await asyncio.sleep(self.backoff_base * 2 ** attempt)
+
+    @forecast_cache.cached(key=_method_key)
+    async def get_real_weather_forecast(self, location, forecast_days):
+        """ Fetches real weather forecast data from Open-Meteo API.  """
+        try:
+            location_data = await geocoder.geocode_async(location)
+            if location_data is None:
+                logger.error(f"Could not find coordinates for '{location}'.")
+                return None, None, None
+
+            lat, lon = location_data.latitude, location_data.longitude
+            data = await self._get_json(self.forecast_url, forecast_params(lat, lon, forecast_days))
+            return parse_forecast(data), lat, lon
+        except Exception as e:
+            logger.error(f"An error occurred while fetching forecast data: {e}")
+            return None, None, None
+
+    @hourly_forecast_cache.cached(key=_method_key)
+    async def get_hourly_weather_forecast(self, location, forecast_days):
+        """ Fetches an hourly weather forecast (up to 16 days) with the same variables the model is trained on.  """
+        try:
+            location_data = await geocoder.geocode_async(location)
+            if location_data is None:
+                logger.error(f"Could not find coordinates for '{location}'.")
+                return None, None, None
+
+            lat, lon = location_data.latitude, location_data.longitude
+            data = await self._get_json(self.forecast_url, hourly_forecast_params(lat, lon, forecast_days))
+            return parse_historical(data), lat, lon
+        except Exception as e:
+            logger.error(f"An error occurred while fetching hourly forecast data: {e}")
+            return None, None, None
+
+    async def get_historical_weather(self, lat, lon, days=365):
+        """ Fetches historical weather data, downloading only the days missing from the local store.  """
+        try:
+            return await self._sync_historical_weather(lat, lon, days)
+        except Exception as e:
+            logger.error(f"Failed to fetch historical weather data, using stored data only: {e}")
+            return await asyncio.to_thread(weather_store.load, lat, lon, *history_window(days))
+
+    @historical_cache.cached(key=_method_key)
+    async def _sync_historical_weather(self, lat, lon, days):
+        """Fetches the days missing from the local store, then loads the window; raises on upstream failure."""
+        start_date, end_date = history_window(days)
+        lat, lon = weather_store.site_key(lat, lon)
+        missing = await asyncio.to_thread(weather_store.missing_ranges, lat, lon, start_date, end_date)
+        for range_start, range_end in missing:
+            data = await self._get_json(self.archive_url, archive_params(lat, lon, range_start, range_end), timeout=60) # Longer timeout for large data
+            await asyncio.to_thread(weather_store.save, lat, lon, parse_historical(data), data.get('utc_offset_seconds', 0))
+        return await asyncio.to_thread(weather_store.load, lat, lon, start_date, end_date)
+
+    @current_weather_cache.cached(key=_method_key)
+    async def get_current_weather(self, lat, lon):
+        """ Fetches current weather for real-time prediction.  """
+        try:
+            data = await self._get_json(self.forecast_url, current_weather_params(lat, lon))
+            return parse_current_weather(data)
+        except Exception as e:
+            logger.error(f"Could not fetch current weather: {e}")
+            return None
+
+# Shared instance used by the FastAPI app; closed on shutdown
+async_weather_api = AsyncWeatherAPI()
@@ -0,0 +1,118 @@
+# File: api/geocoding.py
+
+import os
+import csv
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from cachetools import LRUCache, TTLCache
+from geopy.geocoders import Nominatim
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_DB = os.environ.get("GEOCODE_CACHE_DB", "geocode_cache.sqlite3")
+# Misses are retried after this long, so a transient upstream failure is not remembered forever
+GEOCODE_MISS_TTL = float(os.environ.get("GEOCODE_MISS_TTL", "300"))
+GAZETTEER_FILE = os.environ.get("GEOCODE_GAZETTEER", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv"))
+
+GeocodedLocation = namedtuple("GeocodedLocation", ["latitude", "longitude"])
+
+def _normalize(query):
+    return " ".join(query.split()).casefold()
+
+class Geocoder:
+    """
+    Single geocoding layer for the whole app. Lookups go, in order, through an in-memory
+    LRU, the bundled offline gazetteer, a persistent SQLite cache, and only then Nominatim.
+    Successful network lookups are written back to SQLite so they survive restarts; the
+    database is created on first use. Queries nothing could resolve are remembered only for
+    ``miss_ttl`` seconds.
+    """
+    def __init__(self, db_path=GEOCODE_CACHE_DB, gazetteer_path=GAZETTEER_FILE, memory_size=1024,
+                 user_agent="solar_smart_api", timeout=10, miss_ttl=GEOCODE_MISS_TTL):
+        self.db_path = db_path
+        self._memory = LRUCache(maxsize=memory_size)
+        self._misses = TTLCache(maxsize=memory_size, ttl=miss_ttl)
+        self._lock = threading.Lock()
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+        self._gazetteer = self._load_gazetteer(gazetteer_path)
+        self._schema_ready = False
+
+    @staticmethod
+    def _load_gazetteer(path):
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path, newline="", encoding="utf-8") as f:
+            return {_normalize(row["name"]): GeocodedLocation(float(row["latitude"]), float(row["longitude"]))
+                    for row in csv.DictReader(f)}
+
+    def _execute(self, sql, params=()):
+        """Runs one statement on a short-lived connection, so any thread or worker process can call it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS geocode ("
+                             "query TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL, created_at REAL NOT NULL)")
+                self._schema_ready = True
+            with conn:
+                return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+    def _lookup_offline(self, key):
+        """Gazetteer then SQLite; never touches the network."""
+        if key in self._gazetteer:
+            return self._gazetteer[key]
+        if self.db_path:
+            row = self._execute("SELECT latitude, longitude FROM geocode WHERE query = ?", (key,))
+            if row:
+                return GeocodedLocation(*row)
+        return None
+
+    def _remember(self, key, location):
+        with self._lock:
+            if location is None:
+                self._misses[key] = None
+            else:
+                self._memory[key] = location
+
+    def _cached(self, key):
+        """``(found, location)`` from memory; a recent miss counts as found with no location."""
+        with self._lock:
+            if key in self._memory:
+                return True, self._memory[key]
+            return key in self._misses, None
+
+    def geocode(self, query):
+        """Returns a ``GeocodedLocation`` for ``query``, or None if it cannot be found."""
+        key = _normalize(query)
+        found, location = self._cached(key)
+        if found:
+            return location
+
+        location = self._lookup_offline(key)
+        if location is None:
+            result = self._geolocator.geocode(query)
+            if result is not None:
+                location = GeocodedLocation(result.latitude, result.longitude)
+                if self.db_path:
+                    self._execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+                                  (key, location.latitude, location.longitude, time.time()))
+            else:
+                logger.warning(f"Geocoding found no match for '{query}'.")
+        self._remember(key, location)
+        return location
+
+    async def geocode_async(self, query):
+        """Like ``geocode`` but serves memory hits inline and does disk/network work in a thread."""
+        found, location = self._cached(_normalize(query))
+        if found:
+            return location
+        return await asyncio.to_thread(self.geocode, query)
+
+# Shared instance used by the API and the weather clients
+geocoder = Geocoder()
@@ -1,111 +1,149 @@
 # File: api/weather_api.py
 
+import os
 import pandas as pd
 import requests
-from datetime import date, timedelta
-from geopy.geocoders import Nominatim
 import logging
-from cachetools import cached, TTLCache
+from core.caching import SingleFlightCache
+from api.geocoding import geocoder
+from api.weather_store import weather_store, history_window
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Caches for each API function
-forecast_cache = TTLCache(maxsize=128, ttl=3600)
-historical_cache = TTLCache(maxsize=128, ttl=86400)
-current_weather_cache = TTLCache(maxsize=128, ttl=900)
+DEFAULT_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+DEFAULT_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+FEATURE_ORDER = ['temperature', 'irradiance', 'humidity', 'cloud_cover']
+
+# Caches for each API function, shared with the async client. Concurrent misses are coalesced
+# into one upstream call, and forecasts/current weather are served stale while refreshing.
+forecast_cache = SingleFlightCache('weather_forecast', maxsize=128, ttl=3600, stale_ttl=3600,
+                                   should_cache=lambda result: result[0] is not None)
+hourly_forecast_cache = SingleFlightCache('weather_hourly_forecast', maxsize=128, ttl=3600, stale_ttl=3600,
+                                          should_cache=lambda result: result[0] is not None)
+historical_cache = SingleFlightCache('weather_historical', maxsize=128, ttl=86400)
+current_weather_cache = SingleFlightCache('weather_current', maxsize=128, ttl=900, stale_ttl=900,
+                                          should_cache=lambda result: result is not None)
+
+# --- Request parameters and response parsing, shared with api/async_weather_api.py ---
+
+# The base URLs are read from the environment when used, so tests can point the clients at a stand-in server
+def forecast_base_url():
+    return os.environ.get("OPEN_METEO_FORECAST_URL", DEFAULT_FORECAST_URL)
+
+def archive_base_url():
+    return os.environ.get("OPEN_METEO_ARCHIVE_URL", DEFAULT_ARCHIVE_URL)
+
+def forecast_params(lat, lon, forecast_days):
+    return {
+        "latitude": lat, "longitude": lon,
+        "daily": "temperature_2m_max,relative_humidity_2m_mean,shortwave_radiation_sum,cloud_cover_mean",
+        "forecast_days": forecast_days, "timezone": "auto"
+    }
+
+def parse_forecast(data):
+    daily_data = data['daily']
+    df = pd.DataFrame()
+    df['date'] = pd.to_datetime(daily_data['time'])
+    df['temperature'] = daily_data['temperature_2m_max']
+    df['irradiance'] = [(val * 1000000) / 86400 for val in daily_data['shortwave_radiation_sum']]
+    df['humidity'] = daily_data['relative_humidity_2m_mean']
+    df['cloud_cover'] = daily_data['cloud_cover_mean']
+    return df
+
+def hourly_forecast_params(lat, lon, forecast_days):
+    return {
+        "latitude": lat, "longitude": lon,
+        "hourly": "temperature_2m,relative_humidity_2m,shortwave_radiation,cloud_cover",
+        "forecast_days": forecast_days, "timezone": "auto"
+    }
+
+def archive_params(lat, lon, start_date, end_date):
+    return {
+        "latitude": lat, "longitude": lon,
+        "start_date": start_date.strftime('%Y-%m-%d'),
+        "end_date": end_date.strftime('%Y-%m-%d'),
+        "hourly": "temperature_2m,relative_humidity_2m,shortwave_radiation,cloud_cover",
+        "timezone": "auto"
+    }
+
+def parse_historical(data):
+    """Parses an hourly archive or hourly forecast response; both use the same variables."""
+    df = pd.DataFrame(data['hourly'])
+    df = df.rename(columns={
+        'time': 'date', 'temperature_2m': 'temperature',
+        'relative_humidity_2m': 'humidity', 'shortwave_radiation': 'irradiance',
+        'cloud_cover': 'cloud_cover'
+    })
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.dropna()
+    return df
+
+def current_weather_params(lat, lon):
+    return {
+        "latitude": lat, "longitude": lon,
+        "current": "temperature_2m,relative_humidity_2m,cloud_cover,shortwave_radiation",
+        "timezone": "auto"
+    }
+
+def parse_current_weather(data):
+    data = data['current']
+    current_weather = pd.DataFrame([{
+        'temperature': data['temperature_2m'],
+        'humidity': data['relative_humidity_2m'],
+        'irradiance': data['shortwave_radiation'],
+        'cloud_cover': data['cloud_cover']
+    }])
+    return current_weather[FEATURE_ORDER]
+
+@historical_cache.cached()
+def _sync_historical_weather(lat, lon, days):
+    """Fetches the days missing from the local store, then loads the window; raises on upstream failure."""
+    start_date, end_date = history_window(days)
+    lat, lon = weather_store.site_key(lat, lon)
+    for range_start, range_end in weather_store.missing_ranges(lat, lon, start_date, end_date):
+        response = requests.get(archive_base_url(), params=archive_params(lat, lon, range_start, range_end), timeout=60) # Longer timeout for large data
+        response.raise_for_status()
+        data = response.json()
+        weather_store.save(lat, lon, parse_historical(data), data.get('utc_offset_seconds', 0))
+    return weather_store.load(lat, lon, start_date, end_date)
 
 class WeatherAPI:
     @staticmethod
-    @cached(cache=forecast_cache)
+    @forecast_cache.cached()
     def get_real_weather_forecast(location, forecast_days):
         """ Fetches real weather forecast data from Open-Meteo API.  """
         try:
-            geolocator = Nominatim(user_agent="solar_forecaster_app", timeout=10)
-            location_data = geolocator.geocode(location)
+            location_data = geocoder.geocode(location)
             if location_data is None:
                 logger.error(f"Could not find coordinates for '{location}'.")
                 return None, None, None
 
             lat, lon = location_data.latitude, location_data.longitude
-            api_url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": lat, "longitude": lon,
-                "daily": "temperature_2m_max,relative_humidity_2m_mean,shortwave_radiation_sum,cloud_cover_mean",
-                "forecast_days": forecast_days, "timezone": "auto"
-            }
-            response = requests.get(api_url, params=params, timeout=30)
+            response = requests.get(forecast_base_url(), params=forecast_params(lat, lon, forecast_days), timeout=30)
             response.raise_for_status()
-            data = response.json()
-
-            daily_data = data['daily']
-            df = pd.DataFrame()
-            df['date'] = pd.to_datetime(daily_data['time'])
-            df['temperature'] = daily_data['temperature_2m_max']
-            df['irradiance'] = [(val * 1000000) / 86400 for val in daily_data['shortwave_radiation_sum']]
-            df['humidity'] = daily_data['relative_humidity_2m_mean']
-            df['cloud_cover'] = daily_data['cloud_cover_mean']
-            return df, lat, lon
+            return parse_forecast(response.json()), lat, lon
         except Exception as e:
             logger.error(f"An error occurred while fetching forecast data: {e}")
             return None, None, None
 
     @staticmethod
-    @cached(cache=historical_cache)
     def get_historical_weather(lat, lon, days=365):
-        """ Fetches historical weather data from the Open-Meteo Archive API.  """
+        """ Fetches historical weather data, downloading only the days missing from the local store.  """
         try:
-            end_date = date.today()
-            start_date = end_date - timedelta(days=days)
-            api_url = "https://archive-api.open-meteo.com/v1/archive"
-            params = {
-                "latitude": lat, "longitude": lon,
-                "start_date": start_date.strftime('%Y-%m-%d'),
-                "end_date": end_date.strftime('%Y-%m-%d'),
-                "hourly": "temperature_2m,relative_humidity_2m,shortwave_radiation,cloud_cover",
-                "timezone": "auto"
-            }
-            response = requests.get(api_url, params=params, timeout=60) # Longer timeout for large data
-            response.raise_for_status()
-            data = response.json()
-
-            df = pd.DataFrame(data['hourly'])
-            df = df.rename(columns={
-                'time': 'date', 'temperature_2m': 'temperature',
-                'relative_humidity_2m': 'humidity', 'shortwave_radiation': 'irradiance',
-                'cloud_cover': 'cloud_cover'
-            })
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.dropna()
-            return df
+            return _sync_historical_weather(lat, lon, days)
         except Exception as e:
-            logger.error(f"Failed to fetch historical weather data: {e}")
-            return pd.DataFrame()
+            logger.error(f"Failed to fetch historical weather data, using stored data only: {e}")
+            return weather_store.load(lat, lon, *history_window(days))
 
     @staticmethod
-    @cached(cache=current_weather_cache)
+    @current_weather_cache.cached()
     def get_current_weather(lat, lon):
         """ Fetches current weather for real-time prediction.  """
         try:
-            api_url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": lat, "longitude": lon,
-                "current": "temperature_2m,relative_humidity_2m,cloud_cover,shortwave_radiation",
-                "timezone": "auto"
-            }
-            response = requests.get(api_url, params=params, timeout=30)
+            response = requests.get(forecast_base_url(), params=current_weather_params(lat, lon), timeout=30)
             response.raise_for_status()
-            data = response.json()['current']
-            
-            current_weather = pd.DataFrame([{
-                'temperature': data['temperature_2m'],
-                'humidity': data['relative_humidity_2m'],
-                'irradiance': data['shortwave_radiation'],
-                'cloud_cover': data['cloud_cover']
-            }])
-            feature_order = ['temperature', 'irradiance', 'humidity', 'cloud_cover']
-            current_weather = current_weather[feature_order]
-            return current_weather
+            return parse_current_weather(response.json())
         except Exception as e:
             logger.error(f"Could not fetch current weather: {e}")
             return None
\ No newline at end of file
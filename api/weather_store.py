@@ -0,0 +1,115 @@
+# File: api/weather_store.py
+
+import os
+import sqlite3
+from datetime import date, timedelta
+import pandas as pd
+
+WEATHER_STORE_DB = os.environ.get("WEATHER_STORE_DB", "weather_store.sqlite3")
+WEATHER_COLUMNS = ['temperature', 'humidity', 'irradiance', 'cloud_cover']
+MIN_HOURS_PER_DAY = 23  # days with fewer hourly rows (e.g. not yet in the archive) are refetched later
+
+class WeatherStore:
+    """
+    Local SQLite store of hourly archive weather keyed by rounded lat/lon and timestamp.
+
+    The store remembers which days it holds in full, so callers only fetch the missing
+    date ranges and training on a known site reads the same rows every time. Only archive
+    rows for hours that have already happened are stored; when a fetch fails, callers
+    read what is stored and nothing is written. The database is created on first use.
+    """
+    def __init__(self, db_path=WEATHER_STORE_DB, precision=2):
+        self.db_path = db_path
+        self.precision = precision
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._schema_ready:
+            conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "CREATE TABLE IF NOT EXISTS hourly_weather ("
+                " lat REAL NOT NULL, lon REAL NOT NULL, date TEXT NOT NULL,"
+                " temperature REAL, humidity REAL, irradiance REAL, cloud_cover REAL,"
+                " PRIMARY KEY (lat, lon, date));"
+                "CREATE TABLE IF NOT EXISTS complete_days ("
+                " lat REAL NOT NULL, lon REAL NOT NULL, day TEXT NOT NULL, PRIMARY KEY (lat, lon, day));"
+            )
+            self._schema_ready = True
+        return conn
+
+    def site_key(self, lat, lon):
+        """Rounds coordinates so nearby requests share one site (and one upstream grid cell)."""
+        return round(float(lat), self.precision), round(float(lon), self.precision)
+
+    def missing_ranges(self, lat, lon, start_date, end_date):
+        """Returns contiguous (start, end) date ranges within [start_date, end_date] not yet stored in full."""
+        lat, lon = self.site_key(lat, lon)
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT day FROM complete_days WHERE lat = ? AND lon = ? AND day BETWEEN ? AND ?",
+                                (lat, lon, start_date.isoformat(), end_date.isoformat())).fetchall()
+        finally:
+            conn.close()
+        complete = {row[0] for row in rows}
+
+        ranges = []
+        day = start_date
+        while day <= end_date:
+            if day.isoformat() not in complete:
+                if ranges and ranges[-1][1] == day - timedelta(days=1):
+                    ranges[-1] = (ranges[-1][0], day)
+                else:
+                    ranges.append((day, day))
+            day += timedelta(days=1)
+        return ranges
+
+    def save(self, lat, lon, df, utc_offset_seconds=0):
+        """
+        Upserts parsed hourly archive rows (as returned by ``parse_historical``) and marks full
+        days complete. Timestamps are site-local, ``utc_offset_seconds`` ahead of UTC as the
+        archive reports; rows for hours that have not happened yet are never stored.
+        """
+        if df is None or df.empty:
+            return
+        stamps = pd.to_datetime(df['date'])
+        site_now = pd.Timestamp.now(tz='UTC').tz_localize(None) + pd.Timedelta(seconds=utc_offset_seconds)
+        observed = (stamps <= site_now).to_numpy()
+        df, stamps = df[observed], stamps[observed]
+        if df.empty:
+            return
+        lat, lon = self.site_key(lat, lon)
+        records = zip([lat] * len(df), [lon] * len(df), stamps.dt.strftime('%Y-%m-%dT%H:%M'),
+                      *(df[col].astype(float) for col in WEATHER_COLUMNS))
+        hours_per_day = stamps.dt.strftime('%Y-%m-%d').value_counts()
+        complete_days = [(lat, lon, day) for day in hours_per_day[hours_per_day >= MIN_HOURS_PER_DAY].index]
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO hourly_weather VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+                conn.executemany("INSERT OR IGNORE INTO complete_days VALUES (?, ?, ?)", complete_days)
+        finally:
+            conn.close()
+
+    def load(self, lat, lon, start_date, end_date):
+        """Reads stored hourly rows for [start_date, end_date] in the same shape as ``parse_historical``."""
+        lat, lon = self.site_key(lat, lon)
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(
+                "SELECT date, temperature, humidity, irradiance, cloud_cover FROM hourly_weather "
+                "WHERE lat = ? AND lon = ? AND date >= ? AND date < ? ORDER BY date",
+                conn, params=(lat, lon, start_date.isoformat(), (end_date + timedelta(days=1)).isoformat()))
+        finally:
+            conn.close()
+        df['date'] = pd.to_datetime(df['date'])
+        return df.dropna().reset_index(drop=True)
+
+def history_window(days, end_date=None):
+    """The inclusive [start, end] date window used for ``days`` of history ending today."""
+    end_date = end_date or date.today()
+    return end_date - timedelta(days=days), end_date
+
+# Shared instance used by both weather clients
+weather_store = WeatherStore()
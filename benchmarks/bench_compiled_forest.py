@@ -0,0 +1,42 @@
+# File: benchmarks/bench_compiled_forest.py
+
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from core.compiled_forest import CompiledForest
+from core.predictor import SimpleSolarPredictor
+
+def _training_data(rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'temperature': rng.uniform(15, 40, rows), 'irradiance': rng.uniform(0, 1000, rows),
+        'humidity': rng.uniform(20, 100, rows), 'cloud_cover': rng.uniform(0, 100, rows),
+    })
+    df['actual_output'] = (df['irradiance'] * 1.7 * 0.20 * (1 + (df['temperature'] - 25) * -0.004)).clip(lower=0)
+    return df
+
+def _best_seconds(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scikit-learn and compiled forest prediction latency.")
+    parser.add_argument("--rows", type=int, default=8760, help="training rows (one year of hourly weather)")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 384])
+    args = parser.parse_args()
+
+    data = _training_data(args.rows, seed=42)
+    predictor = SimpleSolarPredictor()
+    model = predictor.train(data)
+    compiled = CompiledForest.from_sklearn(model)
+    print(f"--- {len(model.estimators_)} trees, {len(compiled.value):,} nodes, depth {compiled.max_depth} ---")
+
+    for batch in args.batches:
+        X = data[predictor.features].sample(batch, random_state=batch)
+        if not np.array_equal(model.predict(X), compiled.predict(X)):
+            raise AssertionError(f"Compiled predictions differ from scikit-learn for batch size {batch}")
+        number = max(1, 200 // batch)
+        sklearn_seconds = _best_seconds(lambda: model.predict(X), number)
+        compiled_seconds = _best_seconds(lambda: compiled.predict(X), number)
+        print(f"{batch:>5} rows: scikit-learn {sklearn_seconds * 1e3:8.3f}ms, compiled {compiled_seconds * 1e3:8.3f}ms "
+              f"({sklearn_seconds / compiled_seconds:.1f}x, identical predictions)")
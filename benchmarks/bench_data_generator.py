@@ -0,0 +1,87 @@
+# File: benchmarks/bench_data_generator.py
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from core.data_generator import SolarDataGenerator
+
+def legacy_generate_realistic_data(num_panels=10, days=30):
+    """The original day x hour x panel loop, kept here as the benchmark baseline."""
+    dates = pd.date_range(start='2025-01-01', periods=days, freq='D')
+    data = []
+    panel_base_efficiency = np.random.normal(0.20, 0.015, num_panels)
+    panel_degradation_rate = np.random.normal(0.5, 0.1, num_panels) / 100 / 365
+    panel_soiling_factor = np.ones(num_panels)
+    panel_health_status = np.ones(num_panels)
+
+    for i, date in enumerate(dates):
+        season_factor = 0.85 + 0.35 * np.sin(2 * np.pi * (date.dayofyear - 80) / 365)
+        daily_cloud_factor = np.random.beta(a=5, b=2) * season_factor
+        base_temp = 18 + 12 * season_factor
+        if np.random.random() < 0.1:
+            panel_soiling_factor[:] = 1.0
+        panel_soiling_factor *= (1 - np.random.uniform(0.001, 0.003, num_panels))
+
+        for hour in range(5, 20):
+            hour_factor = max(0, np.sin(np.pi * (hour - 5) / 14))
+            hourly_cloud_noise = max(0, 1 + np.random.normal(0, 0.2))
+            current_cloud_factor = min(1, daily_cloud_factor * hourly_cloud_noise)
+            base_irradiance = 1100 * hour_factor * current_cloud_factor
+            irradiance = max(0, base_irradiance + np.random.normal(0, 20))
+            temperature = base_temp + (15 * hour_factor * current_cloud_factor) + np.random.normal(0, 1.5)
+            humidity = max(20, min(95, 80 - (temperature - 20) * 2 + np.random.normal(0, 5)))
+
+            for panel_idx in range(num_panels):
+                if panel_health_status[panel_idx] == 1.0 and np.random.random() < 0.0001:
+                    panel_health_status[panel_idx] = np.random.uniform(0.1, 0.5)
+                degradation = (1 - panel_degradation_rate[panel_idx]) ** i
+                current_efficiency = (panel_base_efficiency[panel_idx] * degradation * panel_soiling_factor[panel_idx] * panel_health_status[panel_idx])
+                if np.random.random() < 0.001:
+                    current_efficiency *= np.random.uniform(0.2, 0.7)
+                panel_area = 1.7
+                energy_output = irradiance * current_efficiency * panel_area
+                voltage = 24.0 + (temperature - 25) * -0.1 + np.random.normal(0, 0.5)
+                current = max(0, energy_output / voltage if voltage > 0 else 0)
+                power = voltage * current
+                data.append({
+                    'datetime': date + pd.Timedelta(hours=hour, minutes=np.random.randint(0, 60)),
+                    'panel_id': f'Panel_{panel_idx+1:02d}',
+                    'irradiance': irradiance, 'temperature': temperature, 'humidity': humidity,
+                    'energy_output': max(0, energy_output), 'panel_voltage': voltage,
+                    'panel_current': current, 'panel_power': max(0, power),
+                    'ambient_temp': temperature - np.random.uniform(2, 5),
+                    'wind_speed': max(0, np.random.normal(10, 5))
+                })
+    return pd.DataFrame(data)
+
+def timed(func, **kwargs):
+    start = time.perf_counter()
+    df = func(**kwargs)
+    return df, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized synthetic-data generator against the original loop.")
+    parser.add_argument("--panels", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--legacy-days", type=int, default=14,
+                        help="Days to run the legacy loop for; its time is extrapolated linearly to --days "
+                             "because the full-size loop needs minutes and several GB of dicts.")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the vectorized engine.")
+    args = parser.parse_args()
+
+    print(f"--- {args.panels} panels x {args.days} days ---")
+    fast_df, fast_seconds = timed(SolarDataGenerator.generate_realistic_data, num_panels=args.panels, days=args.days, seed=42)
+    print(f"Vectorized: {len(fast_df):,} rows in {fast_seconds:.2f}s ({fast_df.memory_usage(deep=True).sum() / 1e6:,.0f} MB)")
+
+    if not args.skip_legacy:
+        legacy_days = min(args.legacy_days, args.days)
+        slow_df, slow_seconds = timed(legacy_generate_realistic_data, num_panels=args.panels, days=legacy_days)
+        slow_seconds_full = slow_seconds * args.days / legacy_days
+        print(f"Legacy loop: {len(slow_df):,} rows ({legacy_days} days) in {slow_seconds:.2f}s "
+              f"-> ~{slow_seconds_full:.0f}s for {args.days} days")
+        print(f"Speed-up: ~{slow_seconds_full / fast_seconds:,.0f}x")
+        print("\nColumn means over the same days (vectorized vs legacy):")
+        fast_head = fast_df[fast_df['datetime'] < slow_df['datetime'].max().normalize() + pd.Timedelta(days=1)]
+        numeric = fast_df.select_dtypes('number').columns
+        print(pd.DataFrame({'vectorized': fast_head[numeric].mean(), 'legacy': slow_df[numeric].mean()}).round(3))
@@ -0,0 +1,47 @@
+# File: benchmarks/bench_downsampling.py
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from core.downsampling import minmax_indices, chart_rows, ChartRowPool
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time min/max-per-bucket downsampling of chart series.")
+    parser.add_argument("--points", type=int, default=500, help="target points per series")
+    parser.add_argument("--max-rows", type=int, default=10_000, help="row cap across all series (MAX_ANALYZED_ROWS)")
+    parser.add_argument("--panels", type=int, default=100)
+    parser.add_argument("--chunksize", type=int, default=250_000, help="rows per chunk fed to ChartRowPool")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"--- One series to {args.points} points ---")
+    for size in (10_000, 100_000, 1_000_000, 10_000_000):
+        values = np.cumsum(rng.normal(size=size))
+        start = time.perf_counter()
+        kept = minmax_indices(values, args.points)
+        seconds = time.perf_counter() - start
+        extremes_kept = np.argmin(values) in kept and np.argmax(values) in kept
+        print(f"{size:>12,} rows: {seconds * 1e3:8.2f}ms -> {len(kept)} points, global min/max kept: {extremes_kept}")
+
+    # The analysis endpoints' path: anomalous rows always kept, per-panel series within the row cap
+    rows = 1_000_000 // args.panels * args.panels
+    frame = pd.DataFrame({
+        'panel_id': pd.Categorical.from_codes(np.tile(np.arange(args.panels), rows // args.panels),
+                                              categories=[f'Panel_{i+1:02d}' for i in range(args.panels)]),
+        'energy_output': rng.uniform(0, 400, rows),
+        'is_anomaly': rng.random(rows) < 0.001,
+    })
+    start = time.perf_counter()
+    kept = chart_rows(frame, 'energy_output', args.points, args.max_rows, group_by='panel_id', keep_column='is_anomaly')
+    seconds = time.perf_counter() - start
+    print(f"--- chart_rows, {len(frame):,} rows, {args.panels} panel series: {seconds * 1e3:.1f}ms -> {len(kept):,} rows ---")
+
+    pool = ChartRowPool('energy_output', args.points, args.max_rows, group_by='panel_id', keep_column='is_anomaly')
+    start = time.perf_counter()
+    for offset in range(0, rows, args.chunksize):
+        pool.add(frame.iloc[offset:offset + args.chunksize])
+    reduced = pool.rows()
+    seconds = time.perf_counter() - start
+    print(f"--- ChartRowPool, {args.chunksize:,}-row chunks: {seconds * 1e3:.1f}ms -> {len(reduced):,} rows, "
+          f"anomalies kept: {int(reduced['is_anomaly'].sum())}/{int(frame['is_anomaly'].sum())} ---")
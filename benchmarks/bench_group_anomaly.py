@@ -0,0 +1,29 @@
+# File: benchmarks/bench_group_anomaly.py
+
+import argparse
+import os
+import time
+from core.anomaly_detector import EnhancedAnomalyDetector
+from core.data_generator import SolarDataGenerator
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time per-panel anomaly models across worker counts.")
+    parser.add_argument("--panels", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--jobs", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    data = SolarDataGenerator.generate_realistic_data(num_panels=args.panels, days=args.days, seed=42)
+    print(f"--- {len(data):,} rows, {args.panels} panel models, {os.cpu_count()} cores ---")
+
+    start = time.perf_counter()
+    EnhancedAnomalyDetector().detect_anomalies(data)
+    print(f"Fleet-wide model: {time.perf_counter() - start:.2f}s")
+
+    baseline = None
+    for n_jobs in args.jobs:
+        start = time.perf_counter()
+        EnhancedAnomalyDetector(group_by='panel_id', n_jobs=n_jobs).detect_anomalies(data)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"Per-panel, n_jobs={n_jobs}: {seconds:.2f}s ({len(data) / seconds:,.0f} rows/s, {baseline / seconds:.1f}x)")
@@ -0,0 +1,58 @@
+# File: benchmarks/bench_model_loading.py
+
+import argparse
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from core.compiled_forest import CompiledForest
+from core.model_registry import atomic_dump
+from core.predictor import SimpleSolarPredictor
+
+def _anonymous_mb():
+    """
+    Anonymous resident memory of this process, from /proc/self/smaps_rollup. Unlike
+    memory-mapped file pages, it cannot be shared with other workers through the page cache.
+    """
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["Anonymous"].split()[0]) / 1024
+
+def _timed_load(path, mmap_mode, features):
+    start = time.perf_counter()
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    load_seconds = time.perf_counter() - start
+    model.predict(features)  # touch the pages a request would
+    return model, load_seconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare loading a pickled forest against a memory-mapped compiled forest.")
+    parser.add_argument("--rows", type=int, default=8760)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame({
+        'temperature': rng.uniform(15, 40, args.rows), 'irradiance': rng.uniform(0, 1000, args.rows),
+        'humidity': rng.uniform(20, 100, args.rows), 'cloud_cover': rng.uniform(0, 100, args.rows),
+    })
+    data['actual_output'] = data['irradiance'] * 1.7 * 0.20 * (1 + (data['temperature'] - 25) * -0.004)
+    predictor = SimpleSolarPredictor()
+    model = predictor.train(data)
+    features = data[predictor.features].iloc[:24]
+
+    with tempfile.TemporaryDirectory() as directory:
+        sklearn_path = os.path.join(directory, "forest.joblib")
+        compiled_path = os.path.join(directory, "compiled.joblib")
+        atomic_dump(model, sklearn_path)
+        atomic_dump(CompiledForest.from_sklearn(model), compiled_path)
+        del model
+
+        for label, path, mmap_mode in (("scikit-learn pickle", sklearn_path, None),
+                                       ("compiled, memory-mapped", compiled_path, "r")):
+            before = _anonymous_mb()
+            loaded, load_seconds = _timed_load(path, mmap_mode, features)
+            print(f"{label:>24}: {os.path.getsize(path) / 1e6:6.1f} MB on disk, loaded in {load_seconds * 1e3:7.1f}ms, "
+                  f"+{_anonymous_mb() - before:6.1f} MB unshareable memory per worker")
+            del loaded
@@ -0,0 +1,49 @@
+# File: benchmarks/bench_response_encoding.py
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from core.response_encoding import encode_columnar_json, encode_arrow_stream
+
+def make_analyzed_frame(rows, num_panels, rng):
+    """An analysis result shaped like /api/analyze-performance's ``analyzed_data``."""
+    return pd.DataFrame({
+        'datetime': pd.date_range('2025-01-01', periods=rows, freq='min').astype(str),
+        'panel_id': pd.Categorical.from_codes(rng.integers(0, num_panels, rows),
+                                              categories=[f'Panel_{i+1:02d}' for i in range(num_panels)]),
+        'irradiance': rng.uniform(0, 1100, rows), 'temperature': rng.normal(30, 5, rows),
+        'humidity': rng.uniform(20, 95, rows), 'energy_output': rng.uniform(0, 400, rows),
+        'panel_voltage': rng.normal(24, 0.5, rows), 'panel_current': rng.uniform(0, 15, rows),
+        'panel_power': rng.uniform(0, 400, rows), 'ambient_temp': rng.normal(27, 5, rows),
+        'wind_speed': rng.uniform(0, 20, rows), 'anomaly': rng.choice([-1, 1], rows),
+        'anomaly_score': rng.uniform(-0.7, -0.3, rows), 'is_anomaly': rng.random(rows) < 0.1,
+    })
+
+def timed(label, encode, rows):
+    start = time.perf_counter()
+    body = encode()
+    seconds = time.perf_counter() - start
+    print(f"{label:<22} {seconds:7.2f}s {len(body) / 1e6:9.1f} MB {rows / seconds:>12,.0f} rows/s")
+    return seconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare response encodings for a large analysis payload.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--panels", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    frame = make_analyzed_frame(args.rows, args.panels, rng)
+    health_report = {f'Panel_{i+1:02d}': {'health_status': 'Good', 'anomaly_rate': 2.5} for i in range(args.panels)}
+    payload = {"health_report": health_report, "analyzed_data": frame}
+    print(f"--- {args.rows:,} rows x {frame.shape[1]} columns ---")
+
+    # What FastAPI does with the default response: records, jsonable_encoder, then json.dumps
+    baseline = timed("JSON records", lambda: JSONResponse(jsonable_encoder(
+        {"health_report": health_report, "analyzed_data": frame.to_dict(orient='records')})).body, args.rows)
+    columnar = timed("Columnar JSON (orjson)", lambda: encode_columnar_json(payload), args.rows)
+    arrow = timed("Arrow IPC stream", lambda: encode_arrow_stream(payload, "analyzed_data"), args.rows)
+    print(f"Speedup: columnar JSON {baseline / columnar:.0f}x, Arrow {baseline / arrow:.0f}x")
@@ -1,79 +1,251 @@
 # File: core/anomaly_detector.py
 
+import threading
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
+import joblib
+from joblib import Parallel, delayed
 import pandas as pd
+import numpy as np
+from core.model_registry import ModelRegistry, atomic_dump
+
+ANOMALY_MODEL_FILE = 'anomaly_model.joblib'
+
+# Re-checks the model file's modification time, so a refit in any worker is picked up by all of them
+anomaly_model_registry = ModelRegistry(default_model_file=ANOMALY_MODEL_FILE)
+
+def _predict_with_scores(detector, feature_data):
+    """Equivalent to ``predict`` plus ``score_samples`` but walks the forest only once."""
+    anomaly_scores = detector.score_samples(feature_data)
+    anomalies = np.where(anomaly_scores < detector.offset_, -1, 1)
+    return anomalies, anomaly_scores
+
+def _fit_group(features, contamination):
+    """Fits a dedicated scaler and forest on one panel group, to score its rows later."""
+    scaler = StandardScaler()
+    detector = IsolationForest(contamination=contamination, random_state=42)
+    detector.fit(scaler.fit_transform(features))
+    return scaler, detector
 
 class EnhancedAnomalyDetector:
     """Enhanced anomaly detection with multiple methods"""
+    FEATURES = ['energy_output', 'panel_voltage', 'panel_current', 'panel_power']
     
     # FIX: Correctly indented __init__ method
-    def __init__(self, contamination=0.1):
+    def __init__(self, contamination=0.1, group_by=None, n_jobs=-1, min_group_size=50):
+        """
+        With ``group_by`` set (e.g. 'panel_id' or a string/inverter column), each group gets
+        its own scaler and forest, fitted in parallel across ``n_jobs`` worker processes.
+        Groups smaller than ``min_group_size`` are scored by a fleet-wide model instead.
+        """
         self.contamination = contamination
+        self.group_by = group_by
+        self.n_jobs = n_jobs
+        self.min_group_size = min_group_size
         self.detector = IsolationForest(contamination=contamination, random_state=42)
         self.scaler = StandardScaler()
+        self.fitted_features = None
+        self.group_models = {}
         
     # FIX: Correctly indented detect_anomalies method
     def detect_anomalies(self, data):
         """Detect anomalies using multiple features"""
-        features = ['energy_output', 'panel_voltage', 'panel_current', 'panel_power']
-        available_features = [f for f in features if f in data.columns]
+        available_features = [f for f in self.FEATURES if f in data.columns]
         
         if len(available_features) < 2:
             print("Warning: Insufficient features for anomaly detection.")
             return data
         
-        feature_data = self.scaler.fit_transform(data[available_features].fillna(0))
-        self.detector.fit(feature_data)
-        
-        anomalies = self.detector.predict(feature_data)
-        anomaly_scores = self.detector.score_samples(feature_data)
-        
+        # Fits on the data itself (per group with ``group_by``) and scores it with that model
+        return self.fit(data).score_anomalies(data)
+
+    def fit(self, data):
+        """
+        Fits the fleet-wide scaler and forest on a reference dataset without scoring it; with
+        ``group_by`` set, also one model per group of at least ``min_group_size`` rows.
+        """
+        available_features = [f for f in self.FEATURES if f in data.columns]
+        if len(available_features) < 2:
+            raise ValueError("Insufficient features to fit the anomaly model.")
+        features = self._feature_matrix(data, available_features)
+        self.detector.fit(self.scaler.fit_transform(features))
+        self.fitted_features = available_features
+        self.group_models = {}
+        if self.group_by is not None:
+            if self.group_by not in data.columns:
+                raise ValueError(f"Cannot group anomaly models by missing column '{self.group_by}'.")
+            group_indices = {key: idx for key, idx in data.groupby(self.group_by, observed=True, sort=False).indices.items()
+                             if len(idx) >= self.min_group_size}
+            models = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_group)(features[idx], self.contamination) for idx in group_indices.values()
+            )
+            self.group_models = dict(zip(group_indices, models))
+        return self
+
+    def score_anomalies(self, data):
+        """Scores a new batch against the already-fitted model; nothing is refitted."""
+        if self.fitted_features is None:
+            raise ValueError("Anomaly model has not been fitted.")
+        missing = [f for f in self.fitted_features if f not in data.columns]
+        if missing:
+            raise ValueError(f"Data is missing features the anomaly model was fitted on: {missing}")
+        features = self._feature_matrix(data, self.fitted_features)
+        anomalies = np.ones(len(data), dtype=int)
+        anomaly_scores = np.empty(len(data))
+        covered = np.zeros(len(data), dtype=bool)
+        if self.group_models:
+            if self.group_by not in data.columns:
+                raise ValueError(f"Cannot group anomaly models by missing column '{self.group_by}'.")
+            for key, idx in data.groupby(self.group_by, observed=True, sort=False).indices.items():
+                if key in self.group_models:
+                    scaler, detector = self.group_models[key]
+                    anomalies[idx], anomaly_scores[idx] = _predict_with_scores(detector, scaler.transform(features[idx]))
+                    covered[idx] = True
+
+        # Rows of groups without their own model are scored by the fleet-wide one
+        if not covered.all():
+            rest = ~covered
+            anomalies[rest], anomaly_scores[rest] = _predict_with_scores(self.detector, self.scaler.transform(features[rest]))
+        return self._with_anomaly_columns(data, anomalies, anomaly_scores)
+
+    def save(self, path=ANOMALY_MODEL_FILE):
+        """Persists the fitted fleet and per-group models; written to a unique temp file and swapped in atomically."""
+        if self.fitted_features is None:
+            raise ValueError("Anomaly model has not been fitted.")
+        state = {
+            'contamination': self.contamination, 'features': self.fitted_features,
+            'scaler': self.scaler, 'detector': self.detector,
+            'group_by': self.group_by, 'min_group_size': self.min_group_size, 'group_models': self.group_models
+        }
+        atomic_dump(state, path)
+
+    @classmethod
+    def load(cls, path=ANOMALY_MODEL_FILE):
+        return cls.from_state(joblib.load(path))
+
+    @classmethod
+    def from_state(cls, state):
+        """A detector from the state ``save`` persists."""
+        # Files saved before per-group models were persisted hold a fleet model only
+        instance = cls(contamination=state['contamination'], group_by=state.get('group_by'),
+                       min_group_size=state.get('min_group_size', 50))
+        instance.scaler = state['scaler']
+        instance.detector = state['detector']
+        instance.fitted_features = state['features']
+        instance.group_models = state.get('group_models', {})
+        return instance
+
+    @staticmethod
+    def _feature_matrix(data, features):
+        return data[features].fillna(0).astype('float64').to_numpy()
+
+    @staticmethod
+    def _with_anomaly_columns(data, anomalies, anomaly_scores):
         data_copy = data.copy()
         data_copy['anomaly'] = anomalies
         data_copy['anomaly_score'] = anomaly_scores
         data_copy['is_anomaly'] = anomalies == -1
-        
         return data_copy
-    
+
     # FIX: Correctly indented analyze_panel_health method
     def analyze_panel_health(self, data):
         """Analyze individual panel health"""
-        panel_health = {}
-        
         if 'is_anomaly' not in data.columns:
             data = self.detect_anomalies(data)
 
         if 'is_anomaly' not in data.columns:
             return {}
 
-        for panel_id in data['panel_id'].unique():
-            panel_data = data[data['panel_id'] == panel_id]
-            
-            anomaly_rate = (panel_data['is_anomaly'].sum() / len(panel_data)) * 100 if len(panel_data) > 0 else 0
-            
-            if anomaly_rate > 15:
-                health_status = "Critical"
-                priority = 1
-            elif anomaly_rate > 8:
-                health_status = "Poor"
-                priority = 2
-            elif anomaly_rate > 3:
-                health_status = "Fair"
-                priority = 3
-            else:
-                health_status = "Good"
-                priority = 4
-            
-            panel_health[panel_id] = {
-                'health_status': health_status,
-                'anomaly_rate': anomaly_rate,
-                'avg_output': panel_data['energy_output'].mean(),
-                'output_stability': panel_data['energy_output'].std(),
-                'voltage_stability': panel_data['panel_voltage'].std(),
-                'priority': priority,
-                'total_readings': len(panel_data),
-                'anomaly_count': panel_data['is_anomaly'].sum()
-            }
-        
-        return panel_health
\ No newline at end of file
+        return PanelHealthAccumulator().add(data).report()
+
+class PanelHealthAccumulator:
+    """
+    ``analyze_panel_health`` built up chunk by chunk from scored data, holding one row of
+    running statistics per panel. Means and standard deviations are merged with the pairwise
+    (Chan et al.) update in float64, so the report matches one computed over all rows at once.
+    """
+    STATISTICS = {'output': 'energy_output', 'voltage': 'panel_voltage'}
+
+    def __init__(self):
+        self.stats = None
+
+    def add(self, data):
+        """Folds one scored chunk into the running statistics; chunks without ``is_anomaly`` are ignored."""
+        if 'is_anomaly' not in data.columns or data.empty:
+            return self
+        # Panels are factorized once and every statistic is a bincount over the codes
+        codes, panels = pd.factorize(data['panel_id'], sort=False)
+        valid = codes >= 0
+        codes, size = codes[valid], len(panels)
+        chunk = pd.DataFrame({
+            'anomaly_count': np.bincount(codes, weights=data['is_anomaly'].to_numpy(dtype=bool)[valid], minlength=size),
+            'total_readings': np.bincount(codes, minlength=size),
+        }, index=pd.Index(np.asarray(panels, dtype=object)))
+        for name, column in self.STATISTICS.items():
+            values = (data[column].to_numpy(dtype='float64', na_value=np.nan)[valid] if column in data.columns
+                      else np.full(len(codes), np.nan))
+            present = ~np.isnan(values)
+            value_codes, values = codes[present], values[present]
+            n = np.bincount(value_codes, minlength=size)
+            mean = np.divide(np.bincount(value_codes, weights=values, minlength=size), n, out=np.zeros(size), where=n > 0)
+            chunk[f'{name}_n'] = n
+            chunk[f'{name}_mean'] = mean
+            chunk[f'{name}_m2'] = np.bincount(value_codes, weights=(values - mean[value_codes]) ** 2, minlength=size)
+        self.stats = chunk if self.stats is None else self._merge(self.stats, chunk)
+        return self
+
+    def _merge(self, a, b):
+        index = a.index.union(b.index, sort=False)
+        a, b = a.reindex(index, fill_value=0), b.reindex(index, fill_value=0)
+        merged = a[['anomaly_count', 'total_readings']] + b[['anomaly_count', 'total_readings']]
+        for name in self.STATISTICS:
+            na, nb = a[f'{name}_n'], b[f'{name}_n']
+            n = na + nb
+            delta = b[f'{name}_mean'] - a[f'{name}_mean']
+            share = (nb / n.where(n > 0)).fillna(0.0)
+            merged[f'{name}_n'] = n
+            merged[f'{name}_mean'] = a[f'{name}_mean'] + delta * share
+            merged[f'{name}_m2'] = a[f'{name}_m2'] + b[f'{name}_m2'] + delta ** 2 * na * share
+        return merged
+
+    def report(self):
+        """The per-panel health report, in the same form as ``analyze_panel_health``."""
+        if self.stats is None:
+            return {}
+        stats = self.stats
+        report = pd.DataFrame(index=stats.index)
+        report['anomaly_rate'] = stats['anomaly_count'] / stats['total_readings'] * 100
+        rate = report['anomaly_rate'].to_numpy()
+        conditions = [rate > 15, rate > 8, rate > 3]
+        report['health_status'] = np.select(conditions, ["Critical", "Poor", "Fair"], default="Good")
+        report['priority'] = np.select(conditions, [1, 2, 3], default=4)
+        report['avg_output'] = stats['output_mean'].where(stats['output_n'] > 0)
+        for name in self.STATISTICS:
+            report[f'{name}_stability'] = np.sqrt(stats[f'{name}_m2'] / (stats[f'{name}_n'] - 1).where(stats[f'{name}_n'] > 1))
+        report['total_readings'] = stats['total_readings'].astype('int64')
+        report['anomaly_count'] = stats['anomaly_count'].astype('int64')
+
+        columns = ['health_status', 'anomaly_rate', 'avg_output', 'output_stability',
+                   'voltage_stability', 'priority', 'total_readings', 'anomaly_count']
+        return report[columns].to_dict(orient='index')
+
+_loaded_detector = (None, None)   # (persisted state, detector built from it)
+_loaded_detector_lock = threading.Lock()
+
+def load_anomaly_detector():
+    """
+    The persisted anomaly model, or None if nothing has been fitted yet. Served through
+    ``anomaly_model_registry``, so it is reloaded whenever the file on disk changes.
+    """
+    global _loaded_detector
+    try:
+        state = anomaly_model_registry.get()
+    except Exception as e:
+        print(f"Error loading anomaly model: {e}")
+        return None
+    if state is None:
+        return None
+    with _loaded_detector_lock:
+        if _loaded_detector[0] is not state:
+            _loaded_detector = (state, EnhancedAnomalyDetector.from_state(state))
+        return _loaded_detector[1]
\ No newline at end of file
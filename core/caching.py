@@ -0,0 +1,189 @@
+# File: core/caching.py
+
+import time
+import asyncio
+import logging
+import threading
+import functools
+from concurrent.futures import Future
+import pandas as pd
+from cachetools import LRUCache
+from cachetools.keys import hashkey
+
+logger = logging.getLogger(__name__)
+
+# Every named cache registers here so its counters can be reported from one place
+CACHE_REGISTRY = {}
+
+def cache_stats():
+    """Returns hit/miss/coalesce counters for every registered cache."""
+    return {name: cache.stats() for name, cache in CACHE_REGISTRY.items()}
+
+def copy_frames(value):
+    """``value`` with every DataFrame in it (directly or inside a tuple) copied; anything else as is."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(copy_frames(item) for item in value)
+    return value
+
+class SingleFlightCache:
+    """
+    Thread- and asyncio-safe TTL cache that coalesces concurrent misses.
+
+    When several callers miss on the same key at once, only the first runs the loader;
+    the rest wait on its result, whether they are threads or coroutines. With
+    ``stale_ttl`` set, an expired entry younger than ``ttl + stale_ttl`` is served
+    immediately while a single background refresh replaces it. Failed loads are never
+    cached, and ``should_cache`` can veto caching of error-marker return values.
+
+    A coroutine loader runs as its own task, so a caller that is cancelled (say, a client
+    disconnecting) neither cancels the load nor fails the callers waiting on it. Every caller
+    gets ``copy_value(value)``, by default a copy of any DataFrames, so callers may modify
+    what they receive without corrupting the cached entry.
+    """
+    def __init__(self, name, maxsize=128, ttl=60, stale_ttl=0, should_cache=None, copy_value=copy_frames):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.should_cache = should_cache or (lambda value: True)
+        self.copy_value = copy_value or (lambda value: value)
+        self._entries = LRUCache(maxsize=maxsize)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._tasks = set()
+        self._counters = dict.fromkeys(['hits', 'misses', 'coalesced', 'stale_served', 'refreshes', 'errors'], 0)
+        CACHE_REGISTRY[name] = self
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[1] < self.ttl
+
+    def _claim(self, key):
+        """
+        Under the lock, decides what this caller does. Returns (action, payload):
+        ('hit', value), ('stale', value) with a refresh to run, ('wait', future), or ('load', future).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.monotonic() - stored_at
+                if age < self.ttl:
+                    self._counters['hits'] += 1
+                    return 'hit', value
+                if age < self.ttl + self.stale_ttl:
+                    self._counters['stale_served'] += 1
+                    if key in self._inflight:
+                        return 'hit', value
+                    self._counters['refreshes'] += 1
+                    self._inflight[key] = self._new_future()
+                    return 'stale', value
+            if key in self._inflight:
+                self._counters['coalesced'] += 1
+                return 'wait', self._inflight[key]
+            self._counters['misses'] += 1
+            future = self._inflight[key] = self._new_future()
+            return 'load', future
+
+    @staticmethod
+    def _new_future():
+        # A running future cannot be cancelled, so one cancelled waiter cannot fail the others
+        future = Future()
+        future.set_running_or_notify_cancel()
+        return future
+
+    def _settle(self, key, value=None, error=None):
+        with self._lock:
+            future = self._inflight.pop(key)
+            if error is None and self.should_cache(value):
+                self._entries[key] = (value, time.monotonic())
+            if error is not None:
+                self._counters['errors'] += 1
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def _load(self, key, loader):
+        try:
+            value = loader()
+        except BaseException as e:
+            self._settle(key, error=e)
+            raise
+        self._settle(key, value)
+        return value
+
+    async def _aload(self, key, loader):
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._settle(key, error=e)
+            raise
+        self._settle(key, value)
+        return value
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for ``key``, calling ``loader()`` at most once across threads on a miss."""
+        action, payload = self._claim(key)
+        if action == 'wait':
+            return self.copy_value(payload.result())
+        if action == 'stale':
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+        if action in ('hit', 'stale'):
+            return self.copy_value(payload)
+        return self.copy_value(self._load(key, loader))
+
+    async def aget_or_load(self, key, loader):
+        """Async ``get_or_load``; ``loader`` is a coroutine function and waiting never blocks the event loop."""
+        action, payload = self._claim(key)
+        if action == 'wait':
+            return self.copy_value(await asyncio.wrap_future(payload))
+        if action == 'stale':
+            self._spawn(self._arefresh(key, loader))
+        if action in ('hit', 'stale'):
+            return self.copy_value(payload)
+        # Shielded: cancelling this caller leaves the load running for everyone waiting on it
+        return self.copy_value(await asyncio.shield(self._spawn(self._aload(key, loader))))
+
+    def _spawn(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh of cache '{self.name}' failed: {e}")
+
+    async def _arefresh(self, key, loader):
+        try:
+            await self._aload(key, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh of cache '{self.name}' failed: {e}")
+
+    def cached(self, key=hashkey):
+        """Decorator form for sync or async functions; ``key`` builds the cache key from the call arguments."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    return await self.aget_or_load(key(*args, **kwargs), lambda: func(*args, **kwargs))
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_load(key(*args, **kwargs), lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
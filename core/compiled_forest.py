@@ -0,0 +1,120 @@
+# File: core/compiled_forest.py
+
+import threading
+import weakref
+import numpy as np
+
+class CompiledForest:
+    """
+    A fitted scikit-learn forest regressor flattened into contiguous node arrays and
+    evaluated with NumPy.
+
+    All trees share one set of arrays; leaves point back to themselves, so every tree is
+    walked in lockstep for a fixed ``max_depth`` steps with no per-call validation or
+    thread-pool dispatch. Inputs are rounded to float32 and tree outputs are summed in
+    estimator order, as scikit-learn does, so predictions match ``model.predict`` exactly.
+
+    The object holds nothing but plain NumPy arrays, so an uncompressed ``joblib`` dump can
+    be loaded with ``mmap_mode='r'`` and its pages shared by every process on the host.
+    """
+    def __init__(self, feature, threshold, children, missing_go_to_left, value, roots, max_depth, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flattens a fitted single-output ``RandomForestRegressor`` (or ``ExtraTreesRegressor``)."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output forests can be compiled.")
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        feature, threshold, children, missing_go_to_left, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            # Leaves loop back to themselves so extra steps past a shallow leaf are no-ops
+            left = np.where(is_leaf, nodes, tree.children_left) + offset
+            right = np.where(is_leaf, nodes, tree.children_right) + offset
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            children.append(np.stack([left, right], axis=1))
+            missing_go_to_left.append(tree.missing_go_to_left.astype(bool))
+            value.append(tree.value[:, 0, 0])
+
+        # 32-bit node indices halve the footprint unless the forest is too big to address with them
+        index_dtype = np.int32 if 2 * offsets[-1] < np.iinfo(np.int32).max else np.int64
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(index_dtype),
+            missing_go_to_left=np.concatenate(missing_go_to_left),
+            value=np.concatenate(value).astype(np.float64),
+            roots=offsets[:-1].astype(index_dtype),
+            max_depth=max(tree.max_depth for tree in trees),
+            feature_names=getattr(model, "feature_names_in_", None),
+        )
+
+    def __setstate__(self, state):
+        # Plain ndarray views of memory-mapped arrays: np.memmap results pay subclass overhead on every take()
+        self.__dict__.update({name: np.asarray(value) if isinstance(value, np.ndarray) else value
+                              for name, value in state.items()})
+
+    def _as_matrix(self, X):
+        if hasattr(X, "columns") and self.feature_names is not None:
+            # A DataFrame sub-selection costs more than the prediction itself; stack the columns instead
+            if X.columns.tolist() == self.feature_names:
+                X = X.to_numpy(dtype=np.float32)
+            else:
+                X = np.column_stack([X[name].to_numpy(dtype=np.float32) for name in self.feature_names])
+        elif isinstance(X, dict):
+            X = [[X[name] for name in self.feature_names]]
+        X = np.asarray(X, dtype=np.float32)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def apply(self, X):
+        """Leaf node index (into the flattened arrays) of every row in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        # Flat indexing with ``take`` avoids the overhead of 2-D fancy indexing on every step
+        values = X.ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        children = self.children.ravel()
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        has_missing = np.isnan(values).any()
+        for _ in range(self.max_depth):
+            x = values.take(row_offsets + self.feature.take(nodes))
+            go_right = ~(x <= self.threshold.take(nodes))
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_go_to_left.take(nodes))
+            nodes = children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict(self, X):
+        """Mean leaf value over trees. ``X`` may be a DataFrame, a 2-D array, a single row or a feature dict."""
+        leaf_values = self.value.take(self.apply(X).T)
+        # A running sum adds trees one at a time, in the same order as scikit-learn; ``sum`` may
+        # switch to pairwise summation and differ in the last bits
+        return np.cumsum(leaf_values, axis=0)[-1] / len(self.roots)
+
+_compiled = weakref.WeakKeyDictionary()
+_compile_lock = threading.Lock()
+
+def compile_forest(model):
+    """
+    Returns the ``CompiledForest`` for a fitted forest, compiling it once per model object.
+    Models that are already compiled, or are not tree forests, are returned as they are.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if isinstance(model, CompiledForest) or not estimators or not hasattr(estimators[0], "tree_"):
+        return model
+    with _compile_lock:
+        compiled = _compiled.get(model)
+        if compiled is None:
+            compiled = _compiled[model] = CompiledForest.from_sklearn(model)
+        return compiled
@@ -4,51 +4,186 @@ import pandas as pd
 import numpy as np
 
 class SolarDataGenerator:
+    HOURS = np.arange(5, 20)
+    PANEL_AREA = 1.7
+
+    PANEL_BLOCK = 1024  # panels that share one random stream per day
+
+    # Random stream kinds; each (kind, day, panel block) key gets its own stream
+    _TRAITS, _WEATHER, _READINGS = 0, 1, 2
+
+    @staticmethod
+    def generate_realistic_data(num_panels=10, days=30, seed=None):
+        """Generates a day x hour x panel grid of synthetic readings in one vectorized pass.
+
+        The same ``seed`` always reproduces the same frame, and the same readings that
+        ``generate_chunks`` yields for that seed. Rows are ordered by day, then hour,
+        then panel. ``panel_id`` is categorical to keep large fleets compact.
+        """
+        chunks = SolarDataGenerator.generate_chunks(num_panels, days, seed=seed, days_per_chunk=max(days, 1))
+        return next(chunks, pd.DataFrame())
+
+    @staticmethod
+    def _rng(entropy, *key):
+        return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=key))
+
+    @staticmethod
+    def _panel_traits(entropy, num_panels):
+        """Per-panel efficiency, degradation and failure, drawn one fixed block of panels at a time."""
+        blocks = []
+        for first_panel in range(0, num_panels, SolarDataGenerator.PANEL_BLOCK):
+            n = min(SolarDataGenerator.PANEL_BLOCK, num_panels - first_panel)
+            rng = SolarDataGenerator._rng(entropy, SolarDataGenerator._TRAITS, first_panel // SolarDataGenerator.PANEL_BLOCK)
+            blocks.append((
+                rng.normal(0.20, 0.015, n),
+                rng.normal(0.5, 0.1, n) / 100 / 365,
+                # Sudden failures: each panel fails at most once and stays degraded afterwards
+                rng.geometric(0.0001, n) - 1,
+                rng.uniform(0.1, 0.5, n),
+            ))
+        return [np.concatenate(trait) for trait in zip(*blocks)]
+
+    @staticmethod
+    def _daily_weather(entropy, day):
+        """Fleet-wide weather for one day: cloud cover, cleaning, and the hourly noise terms."""
+        num_hours = len(SolarDataGenerator.HOURS)
+        rng = SolarDataGenerator._rng(entropy, SolarDataGenerator._WEATHER, day)
+        return {
+            'daily_cloud': rng.beta(a=5, b=2), 'cleaning': rng.random() < 0.1,
+            'hourly_cloud_noise': rng.normal(0, 0.2, num_hours), 'irradiance_noise': rng.normal(0, 20, num_hours),
+            'temperature_noise': rng.normal(0, 1.5, num_hours), 'humidity_noise': rng.normal(0, 5, num_hours),
+        }
+
+    @staticmethod
+    def _block_readings(entropy, day, block, num_panels):
+        """Per-reading draws for one day and one fixed block of panels."""
+        first_panel = block * SolarDataGenerator.PANEL_BLOCK
+        shape = (len(SolarDataGenerator.HOURS), min(SolarDataGenerator.PANEL_BLOCK, num_panels - first_panel))
+        rng = SolarDataGenerator._rng(entropy, SolarDataGenerator._READINGS, day, block)
+        return {
+            'soiling': rng.uniform(0.001, 0.003, shape[1]),
+            'transient_dip': rng.random(shape) < 0.001, 'dip_factor': rng.uniform(0.2, 0.7, shape),
+            'voltage_noise': rng.normal(0, 0.5, shape), 'minutes': rng.integers(0, 60, shape),
+            'ambient_offset': rng.uniform(2, 5, shape), 'wind_speed': rng.normal(10, 5, shape),
+        }
+
+    @staticmethod
+    def generate_chunks(num_panels=10, days=30, seed=None, days_per_chunk=1, rows_per_chunk=None, panels_per_chunk=None):
+        """Yields the same readings as ``generate_realistic_data`` one block of days and panels at a time.
+
+        Chunks cover ``days_per_chunk`` days of ``panels_per_chunk`` panels (all by default).
+        ``rows_per_chunk`` overrides both: whole days of the full fleet when they fit, otherwise
+        one day of as many panels as fit, so chunk size stays bounded however large the
+        fleet is. Random draws come from separate streams per day and fixed block of
+        ``PANEL_BLOCK`` panels, derived from ``seed``, so a seed gives the same readings
+        whatever the chunk sizes. Only per-panel state (traits and soiling) is carried
+        between chunks.
+        """
+        hours = SolarDataGenerator.HOURS
+        num_hours = len(hours)
+        if rows_per_chunk is not None:
+            if rows_per_chunk >= num_hours * num_panels:
+                days_per_chunk, panels_per_chunk = rows_per_chunk // (num_hours * num_panels), num_panels
+            else:
+                days_per_chunk, panels_per_chunk = 1, max(1, rows_per_chunk // num_hours)
+        panels_per_chunk = panels_per_chunk or num_panels
+        entropy = np.random.SeedSequence(seed).entropy
+        categories = [f'Panel_{panel_idx+1:02d}' for panel_idx in range(num_panels)]
+
+        base_efficiency, degradation_rate, failure_step, failure_factor = SolarDataGenerator._panel_traits(entropy, num_panels)
+        log_soiling = np.zeros(num_panels)
+
+        for first_day in range(0, days, days_per_chunk):
+            day_index = np.arange(first_day, min(first_day + days_per_chunk, days))
+            weather = [SolarDataGenerator._daily_weather(entropy, day) for day in day_index]
+            block_draws = {}
+
+            for first_panel in range(0, num_panels, panels_per_chunk):
+                last_panel = min(first_panel + panels_per_chunk, num_panels)
+                panels = slice(first_panel, last_panel)
+                blocks = range(first_panel // SolarDataGenerator.PANEL_BLOCK, (last_panel - 1) // SolarDataGenerator.PANEL_BLOCK + 1)
+                # Blocks straddling two chunks are drawn once; earlier blocks are no longer needed
+                block_draws = {key: draws for key, draws in block_draws.items() if key[1] >= blocks[0]}
+                for day in day_index:
+                    for block in blocks:
+                        if (day, block) not in block_draws:
+                            block_draws[day, block] = SolarDataGenerator._block_readings(entropy, day, block, num_panels)
+                offset = blocks[0] * SolarDataGenerator.PANEL_BLOCK
+                columns = slice(first_panel - offset, last_panel - offset)
+
+                def per_panel(name):
+                    """``name`` draws for this chunk's days and panels, stacked along the day axis."""
+                    return np.stack([np.concatenate([block_draws[day, block][name] for block in blocks], axis=-1)[..., columns]
+                                     for day in day_index])
+
+                yield SolarDataGenerator._chunk_frame(day_index, panels, weather, per_panel, categories, log_soiling,
+                                                      base_efficiency, degradation_rate, failure_step, failure_factor)
+
     @staticmethod
-    def generate_realistic_data(num_panels=10, days=30):
-        dates = pd.date_range(start='2025-01-01', periods=days, freq='D')
-        data = []
-        panel_base_efficiency = np.random.normal(0.20, 0.015, num_panels)
-        panel_degradation_rate = np.random.normal(0.5, 0.1, num_panels) / 100 / 365
-        panel_soiling_factor = np.ones(num_panels)
-        panel_health_status = np.ones(num_panels)
-
-        for i, date in enumerate(dates):
-            season_factor = 0.85 + 0.35 * np.sin(2 * np.pi * (date.dayofyear - 80) / 365)
-            daily_cloud_factor = np.random.beta(a=5, b=2) * season_factor
-            base_temp = 18 + 12 * season_factor
-            if np.random.random() < 0.1:
-                panel_soiling_factor[:] = 1.0
-            panel_soiling_factor *= (1 - np.random.uniform(0.001, 0.003, num_panels))
-
-            for hour in range(5, 20):
-                hour_factor = max(0, np.sin(np.pi * (hour - 5) / 14))
-                hourly_cloud_noise = max(0, 1 + np.random.normal(0, 0.2))
-                current_cloud_factor = min(1, daily_cloud_factor * hourly_cloud_noise)
-                base_irradiance = 1100 * hour_factor * current_cloud_factor
-                irradiance = max(0, base_irradiance + np.random.normal(0, 20))
-                temperature = base_temp + (15 * hour_factor * current_cloud_factor) + np.random.normal(0, 1.5)
-                humidity = max(20, min(95, 80 - (temperature - 20) * 2 + np.random.normal(0, 5)))
-
-                for panel_idx in range(num_panels):
-                    if panel_health_status[panel_idx] == 1.0 and np.random.random() < 0.0001:
-                        panel_health_status[panel_idx] = np.random.uniform(0.1, 0.5)
-                    degradation = (1 - panel_degradation_rate[panel_idx]) ** i
-                    current_efficiency = (panel_base_efficiency[panel_idx] * degradation * panel_soiling_factor[panel_idx] * panel_health_status[panel_idx])
-                    if np.random.random() < 0.001:
-                        current_efficiency *= np.random.uniform(0.2, 0.7)
-                    panel_area = 1.7
-                    energy_output = irradiance * current_efficiency * panel_area
-                    voltage = 24.0 + (temperature - 25) * -0.1 + np.random.normal(0, 0.5)
-                    current = max(0, energy_output / voltage if voltage > 0 else 0)
-                    power = voltage * current
-                    data.append({
-                        'datetime': date + pd.Timedelta(hours=hour, minutes=np.random.randint(0, 60)),
-                        'panel_id': f'Panel_{panel_idx+1:02d}',
-                        'irradiance': irradiance, 'temperature': temperature, 'humidity': humidity,
-                        'energy_output': max(0, energy_output), 'panel_voltage': voltage,
-                        'panel_current': current, 'panel_power': max(0, power),
-                        'ambient_temp': temperature - np.random.uniform(2, 5),
-                        'wind_speed': max(0, np.random.normal(10, 5))
-                    })
-        return pd.DataFrame(data)
\ No newline at end of file
+    def _chunk_frame(day_index, panels, weather, per_panel, categories, log_soiling,
+                     base_efficiency, degradation_rate, failure_step, failure_factor):
+        hours = SolarDataGenerator.HOURS
+        num_hours = len(hours)
+        block_days = len(day_index)
+        num_panels = panels.stop - panels.start
+        shape = (block_days, num_hours, num_panels)
+        dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(day_index, unit='D')
+
+        # Per-day weather and soiling (soiling accumulates and resets on cleaning days)
+        season_factor = 0.85 + 0.35 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 80) / 365)
+        daily_cloud_factor = np.array([day['daily_cloud'] for day in weather]) * season_factor
+        base_temp = 18 + 12 * season_factor
+        soiling_draws = per_panel('soiling')
+        panel_log_soiling = np.empty((block_days, num_panels))
+        for i, day in enumerate(weather):
+            carried = 0 if day['cleaning'] else log_soiling[panels]
+            log_soiling[panels] = carried + np.log1p(-soiling_draws[i])
+            panel_log_soiling[i] = log_soiling[panels]
+        panel_soiling_factor = np.exp(panel_log_soiling)
+
+        # Per-hour weather, shared by every panel
+        def hourly(name):
+            return np.stack([day[name] for day in weather])
+
+        hour_factor = np.maximum(0, np.sin(np.pi * (hours - 5) / 14))[None, :]
+        hourly_cloud_noise = np.maximum(0, 1 + hourly('hourly_cloud_noise'))
+        current_cloud_factor = np.minimum(1, daily_cloud_factor[:, None] * hourly_cloud_noise)
+        irradiance = np.maximum(0, 1100 * hour_factor * current_cloud_factor + hourly('irradiance_noise'))
+        temperature = base_temp[:, None] + 15 * hour_factor * current_cloud_factor + hourly('temperature_noise')
+        humidity = np.clip(80 - (temperature - 20) * 2 + hourly('humidity_noise'), 20, 95)
+
+        step_index = (day_index[:, None] * num_hours + np.arange(num_hours)[None, :])[:, :, None]
+        panel_health_status = np.where(step_index >= failure_step[panels], failure_factor[panels], 1.0)
+
+        degradation = (1 - degradation_rate[panels])[None, :] ** day_index[:, None]
+        current_efficiency = (base_efficiency[panels] * degradation * panel_soiling_factor)[:, None, :] * panel_health_status
+
+        # Transient dips on individual readings
+        current_efficiency = np.where(per_panel('transient_dip'), current_efficiency * per_panel('dip_factor'), current_efficiency)
+
+        energy_output = irradiance[:, :, None] * current_efficiency * SolarDataGenerator.PANEL_AREA
+        voltage = 24.0 + (temperature[:, :, None] - 25) * -0.1 + per_panel('voltage_noise')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            current = np.where(voltage > 0, energy_output / voltage, 0)
+        current = np.maximum(0, current)
+        power = voltage * current
+
+        minutes = per_panel('minutes').astype('timedelta64[m]')
+        timestamps = (dates.to_numpy()[:, None, None]
+                      + hours.astype('timedelta64[h]')[None, :, None]
+                      + minutes)
+        panel_ids = pd.Categorical.from_codes(np.tile(np.arange(panels.start, panels.stop), block_days * num_hours), categories=categories)
+
+        def per_reading(values):
+            return np.broadcast_to(values[:, :, None], shape).ravel()
+
+        return pd.DataFrame({
+            'datetime': timestamps.ravel(),
+            'panel_id': panel_ids,
+            'irradiance': per_reading(irradiance), 'temperature': per_reading(temperature),
+            'humidity': per_reading(humidity),
+            'energy_output': np.maximum(0, energy_output).ravel(), 'panel_voltage': voltage.ravel(),
+            'panel_current': current.ravel(), 'panel_power': np.maximum(0, power).ravel(),
+            'ambient_temp': per_reading(temperature) - per_panel('ambient_offset').ravel(),
+            'wind_speed': np.maximum(0, per_panel('wind_speed')).ravel()
+        })
\ No newline at end of file
@@ -0,0 +1,96 @@
+# File: core/downsampling.py
+
+import numpy as np
+from core.ingestion import concat_chunks
+
+MIN_SERIES_POINTS = 4
+
+def minmax_indices(values, max_points):
+    """
+    Positions of a shape-preserving downsample of ``values`` to at most ``max_points`` points:
+    the first and last point plus the minimum and maximum of each of ``(max_points - 2) // 2``
+    equal-width buckets, in order. Peaks and dips survive however coarse the buckets are.
+    Fully vectorized; missing values are never picked unless a bucket has nothing else.
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    max_points = max(max_points, MIN_SERIES_POINTS)
+    inner = np.asarray(values[1:-1], dtype=float)
+    n_buckets = min((max_points - 2) // 2, len(inner))
+
+    # One row per bucket, padded to the widest bucket; padding and NaNs never win
+    edges = np.linspace(0, len(inner), n_buckets + 1).astype(np.int64)
+    sizes = np.diff(edges)
+    offsets = np.arange(sizes.max())
+    grid = np.minimum(edges[:-1, None] + offsets, len(inner) - 1)
+    bucket_values = inner[grid]
+    usable = (offsets < sizes[:, None]) & ~np.isnan(bucket_values)
+    rows = np.arange(n_buckets)
+    lows = grid[rows, np.where(usable, bucket_values, np.inf).argmin(axis=1)]
+    highs = grid[rows, np.where(usable, bucket_values, -np.inf).argmax(axis=1)]
+    return np.unique(np.concatenate(([0], lows + 1, highs + 1, [n - 1])))
+
+def _evenly_spaced(positions, count):
+    if len(positions) <= count:
+        return positions
+    return positions[np.linspace(0, len(positions) - 1, count).round().astype(np.int64)]
+
+def chart_rows(data, value_column, max_points, max_rows, group_by=None, keep_column=None):
+    """
+    Positions of at most ``max_rows`` rows to chart from ``data``. Rows where ``keep_column``
+    is set (e.g. ``is_anomaly``) are always kept, thinned evenly only if they alone exceed
+    ``max_rows``. The remaining budget goes to ``minmax_indices`` series (one per ``group_by``
+    group) of up to ``max_points`` rows each, shrunk so that every series fits; when even
+    ``MIN_SERIES_POINTS`` per series would not fit, the series are downsampled together.
+    """
+    n = len(data)
+    if n <= max_rows:
+        return np.arange(n)
+    flagged = np.flatnonzero(data[keep_column].to_numpy(dtype=bool)) if keep_column in data.columns else np.arange(0)
+    flagged = _evenly_spaced(flagged, max_rows)
+    budget = max_rows - len(flagged)
+    if budget < MIN_SERIES_POINTS:
+        return flagged
+
+    values = data[value_column].to_numpy() if value_column is not None else np.arange(n)
+    groups = (list(data.groupby(group_by, observed=True, sort=False, dropna=False).indices.values())
+              if group_by is not None and group_by in data.columns else [np.arange(n)])
+    per_series = min(max_points, budget // len(groups))
+    if per_series < MIN_SERIES_POINTS:
+        groups, per_series = [np.arange(n)], budget
+    series = [positions[minmax_indices(values[positions], per_series)] for positions in groups]
+    return np.unique(np.concatenate([flagged] + series))
+
+class ChartRowPool:
+    """
+    ``chart_rows`` over a stream of chunks. Each chunk is reduced as it arrives and the pooled
+    candidates are reduced again whenever they pass four times ``max_rows``, so however long
+    the stream, the pool never holds more than a few multiples of the rows it finally returns.
+    """
+    def __init__(self, value_column, max_points, max_rows, group_by=None, keep_column=None):
+        self.value_column = value_column
+        self.max_points = max_points
+        self.max_rows = max_rows
+        self.group_by = group_by
+        self.keep_column = keep_column
+        self._pool = []
+        self._size = 0
+
+    def _reduce(self, data, max_rows):
+        return data.iloc[chart_rows(data, self.value_column, self.max_points, max_rows, self.group_by, self.keep_column)]
+
+    def _compact(self, max_rows):
+        self._pool = [self._reduce(concat_chunks(self._pool), max_rows)] if self._pool else []
+        self._size = sum(len(part) for part in self._pool)
+
+    def add(self, chunk):
+        self._pool.append(self._reduce(chunk, self.max_rows))
+        self._size += len(self._pool[-1])
+        if self._size > 4 * self.max_rows:
+            self._compact(2 * self.max_rows)
+
+    def rows(self):
+        """The final selection of at most ``max_rows`` rows, in stream order, with a fresh index."""
+        self._compact(self.max_rows)
+        return self._pool[0].reset_index(drop=True) if self._pool else None
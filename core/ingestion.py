@@ -0,0 +1,55 @@
+# File: core/ingestion.py
+
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CSV_CHUNKSIZE = 250_000
+# Rows an anomaly model is fitted on when one is trained for an upload; smaller uploads are used whole
+FIT_SAMPLE_ROWS = int(os.environ.get("FIT_SAMPLE_ROWS", "500000"))
+
+# Explicit schema for performance uploads; columns missing from a file are simply ignored.
+PERFORMANCE_FLOAT_COLUMNS = [
+    'energy_output', 'panel_voltage', 'panel_current', 'panel_power',
+    'irradiance', 'temperature', 'humidity', 'ambient_temp', 'wind_speed'
+]
+PERFORMANCE_DTYPES = {col: 'float32' for col in PERFORMANCE_FLOAT_COLUMNS}
+PERFORMANCE_DTYPES['panel_id'] = 'category'
+
+def iter_performance_csv(source, chunksize=CSV_CHUNKSIZE):
+    """
+    Yields a performance CSV in chunks of ``chunksize`` rows using the compact float32/categorical
+    schema, so a caller that processes one chunk at a time never holds more than one in memory.
+    """
+    for chunk in pd.read_csv(source, dtype=PERFORMANCE_DTYPES, chunksize=chunksize):
+        if 'panel_power' not in chunk.columns and 'panel_voltage' in chunk.columns and 'panel_current' in chunk.columns:
+            chunk['panel_power'] = chunk['panel_voltage'] * chunk['panel_current']
+        yield chunk
+
+def concat_chunks(chunks):
+    """Concatenates chunks, unifying the categories of categorical columns so they stay categorical."""
+    if len(chunks) == 1:
+        return chunks[0]
+    for name in chunks[0].columns:
+        if isinstance(chunks[0][name].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[name] for chunk in chunks]).categories
+            chunks = [chunk.assign(**{name: chunk[name].cat.set_categories(categories)}) for chunk in chunks]
+    return pd.concat(chunks, ignore_index=True)
+
+def sample_rows(chunks, max_rows=FIT_SAMPLE_ROWS, columns=None, seed=42):
+    """
+    A uniform random sample of at most ``max_rows`` rows (of ``columns``) from a stream of
+    chunks, in their original order; with fewer rows in total, all of them. Each row draws a
+    random key and the rows with the smallest keys are kept, so memory stays within one chunk
+    plus the sample however long the stream is.
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys = [], np.empty(0)
+    for chunk in chunks:
+        sample.append(chunk[columns] if columns is not None else chunk)
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(keys) > max_rows:
+            kept = np.sort(np.argpartition(keys, max_rows)[:max_rows])
+            sample, keys = [concat_chunks(sample).iloc[kept].reset_index(drop=True)], keys[kept]
+    return concat_chunks(sample) if sample else pd.DataFrame(columns=columns)
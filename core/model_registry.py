@@ -0,0 +1,158 @@
+# File: core/model_registry.py
+
+import os
+import re
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.environ.get("MODEL_DIR", "models")
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "1024"))
+# Arrays in uncompressed model files are memory-mapped, so workers share one page-cached copy
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE", "r") or None
+CURRENT_POINTER = "CURRENT"
+
+_LoadedModel = namedtuple("_LoadedModel", ["model", "signature", "size_bytes"])
+
+def location_slug(location):
+    """Filesystem-safe, case-insensitive directory name for a location."""
+    slug = re.sub(r"[^a-z0-9]+", "_", " ".join(location.split()).casefold()).strip("_")
+    return slug or "unnamed"
+
+def atomic_dump(obj, path):
+    """Writes ``obj`` with joblib to a temp file in the same directory, then renames it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class ModelRegistry:
+    """
+    Versioned per-location model artifacts with hot reload and a memory-bounded LRU.
+
+    Each location has its own directory of ``v<timestamp>.joblib`` files plus a ``CURRENT``
+    pointer that is swapped atomically on save. Readers re-check the pointer and file
+    modification time at most every ``check_interval`` seconds, so a retrain in any
+    worker process is picked up by all of them. Loaded models are kept in an LRU keyed
+    by file, evicted once their on-disk sizes exceed ``memory_budget_mb``. Locations
+    without their own model fall back to ``default_model_file``. With ``mmap_mode`` set,
+    NumPy arrays in the model files are mapped rather than read, so loading is near-instant
+    and the pages are shared between processes; superseded files stay valid while mapped.
+    """
+    def __init__(self, model_dir=MODEL_DIR, default_model_file=None, memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                 keep_versions=3, check_interval=1.0, mmap_mode=MODEL_MMAP_MODE):
+        self.model_dir = model_dir
+        self.default_model_file = default_model_file
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.keep_versions = keep_versions
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self._loaded = OrderedDict()   # model file path -> _LoadedModel
+        self._resolved = {}            # location slug -> (model file path, checked_at)
+        self._lock = threading.Lock()
+
+    def _location_dir(self, location):
+        return os.path.join(self.model_dir, location_slug(location))
+
+    def versions(self, location):
+        """Version ids stored for ``location``, oldest first."""
+        directory = self._location_dir(location)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(".joblib")] for name in os.listdir(directory)
+                      if name.startswith("v") and name.endswith(".joblib"))
+
+    def current_version(self, location):
+        try:
+            with open(os.path.join(self._location_dir(location), CURRENT_POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, location, model):
+        """Stores a new version for ``location`` and atomically points ``CURRENT`` at it."""
+        directory = self._location_dir(location)
+        now_ns = time.time_ns()
+        version = time.strftime("v%Y%m%d%H%M%S", time.gmtime(now_ns // 1_000_000_000)) + f"{now_ns % 1_000_000_000:09d}"
+        atomic_dump(model, os.path.join(directory, f"{version}.joblib"))
+
+        fd, tmp_pointer = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(directory, CURRENT_POINTER))
+
+        for old_version in self.versions(location)[:-self.keep_versions]:
+            if old_version != version:
+                os.remove(os.path.join(directory, f"{old_version}.joblib"))
+        self.invalidate(location)
+        return version
+
+    def invalidate(self, location=None):
+        """Makes the next ``get`` for ``location`` re-check the disk rather than wait out ``check_interval``."""
+        with self._lock:
+            self._resolved.pop(location_slug(location) if location is not None else None, None)
+
+    def _resolve(self, location):
+        """Path of the model file that currently serves ``location`` (or the default)."""
+        if location is not None:
+            version = self.current_version(location)
+            if version is not None:
+                path = os.path.join(self._location_dir(location), f"{version}.joblib")
+                if os.path.exists(path):
+                    return path
+        if self.default_model_file and os.path.exists(self.default_model_file):
+            return self.default_model_file
+        return None
+
+    def get(self, location=None):
+        """Returns the model serving ``location``, loading or reloading it from disk if needed."""
+        slug = location_slug(location) if location is not None else None
+        now = time.monotonic()
+        with self._lock:
+            resolved = self._resolved.get(slug)
+            if resolved and now - resolved[1] < self.check_interval and resolved[0] in self._loaded:
+                self._loaded.move_to_end(resolved[0])
+                return self._loaded[resolved[0]].model
+
+        path = self._resolve(location)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._resolved[slug] = (path, now)
+            entry = self._loaded.get(path)
+            if entry is not None and entry.signature == signature:
+                self._loaded.move_to_end(path)
+                return entry.model
+
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        logger.info(f"Loaded model {path} ({stat.st_size / 1e6:.1f} MB)")
+        with self._lock:
+            self._loaded[path] = _LoadedModel(model, signature, stat.st_size)
+            self._loaded.move_to_end(path)
+            self._evict()
+        return model
+
+    def _evict(self):
+        """Drops least-recently-used models until the budget holds; the newest one always stays."""
+        total = sum(entry.size_bytes for entry in self._loaded.values())
+        while total > self.memory_budget_bytes and len(self._loaded) > 1:
+            path, entry = self._loaded.popitem(last=False)
+            total -= entry.size_bytes
+            logger.info(f"Evicted model {path} from memory")
+
+    def loaded_models(self):
+        with self._lock:
+            return {path: entry.size_bytes for path, entry in self._loaded.items()}
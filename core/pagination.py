@@ -0,0 +1,161 @@
+# File: core/pagination.py
+
+import os
+import re
+import time
+import base64
+import uuid
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 10_000
+ANALYSIS_RESULTS_DIR = os.environ.get("ANALYSIS_RESULTS_DIR", "analysis_results")
+ANALYSIS_RESULTS_TTL = float(os.environ.get("ANALYSIS_RESULTS_TTL", "3600"))
+ANALYSIS_RESULTS_MAX_MB = float(os.environ.get("ANALYSIS_RESULTS_MAX_MB", "2048"))
+_RESULT_ID = re.compile(r"[0-9a-f]{32}")
+
+def encode_cursor(position):
+    """An opaque, URL-safe cursor for an integer position."""
+    return base64.urlsafe_b64encode(str(int(position)).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """The position behind ``encode_cursor``; raises ValueError for anything it did not produce."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+class ResultWriter:
+    """Appends DataFrame chunks to one result file; the file only becomes visible on ``close``."""
+    def __init__(self, store, result_id):
+        self.store = store
+        self.result_id = result_id
+        self.rows = 0
+        self._tmp_path = store._path(result_id) + ".tmp"
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            # Categoricals get a fixed index width so every chunk shares the first chunk's schema
+            fields = [pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field for field in table.schema]
+            self._schema = pa.schema(fields, metadata=table.schema.metadata)
+            os.makedirs(self.store.directory, exist_ok=True)
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+        self.rows += len(chunk)
+
+    def close(self):
+        """Publishes the result and returns its id."""
+        if self._writer is None:
+            import pandas as pd
+            self.write(pd.DataFrame())
+        self._writer.close()
+        os.replace(self._tmp_path, self.store._path(self.result_id))
+        self.store.cleanup()
+        return self.result_id
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class ResultStore:
+    """
+    Full result tables behind downsampled responses, spilled to Parquet files under
+    ``directory`` so they cost no memory once written and any worker on the host can
+    page through them. Results expire after ``ttl`` seconds, and the oldest are deleted
+    once the files together exceed ``max_mb``. Stored tables never change, so a cursor
+    is simply the next row's position. Requires pyarrow.
+    """
+    def __init__(self, directory=ANALYSIS_RESULTS_DIR, ttl=ANALYSIS_RESULTS_TTL, max_mb=ANALYSIS_RESULTS_MAX_MB):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+
+    def _path(self, result_id):
+        return os.path.join(self.directory, f"{result_id}.parquet")
+
+    def writer(self):
+        """A ``ResultWriter`` for a new result; use it as a context manager and ``write`` chunks to it."""
+        return ResultWriter(self, uuid.uuid4().hex)
+
+    def cleanup(self):
+        """Deletes expired results, then the oldest ones until the store is within its size limit."""
+        with self._lock:
+            try:
+                names = [name for name in os.listdir(self.directory) if name.endswith(".parquet")]
+            except FileNotFoundError:
+                return
+            files = []
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            files.sort()
+            now, total = time.time(), sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if now - mtime <= self.ttl and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def page(self, result_id, cursor=None, limit=1000):
+        """
+        ``(rows, next_cursor, total_rows)`` for up to ``limit`` rows from ``cursor`` on, or None
+        if the result does not exist or has expired. ``next_cursor`` is None on the last page.
+        Only the row groups holding the page are read.
+        """
+        import pyarrow.parquet as pq
+
+        path = self._path(result_id)
+        if not _RESULT_ID.fullmatch(result_id):
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            parquet_file = pq.ParquetFile(path)
+        except FileNotFoundError:
+            return None
+        total = parquet_file.metadata.num_rows
+        start = decode_cursor(cursor) if cursor else 0
+        if not 0 <= start <= total:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        end = min(start + limit, total)
+
+        groups, group_start, first_row = [], 0, None
+        for i in range(parquet_file.num_row_groups):
+            group_end = group_start + parquet_file.metadata.row_group(i).num_rows
+            if group_end > start and group_start < end:
+                groups.append(i)
+                first_row = group_start if first_row is None else first_row
+            group_start = group_end
+        if groups:
+            rows = parquet_file.read_row_groups(groups).slice(start - first_row, end - start).to_pandas()
+        else:
+            rows = parquet_file.schema_arrow.empty_table().to_pandas()
+        return rows, encode_cursor(end) if end < total else None, total
@@ -1,19 +1,78 @@
 # File: core/predictor.py
 
 import os
-import joblib
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from functools import lru_cache
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from core.compiled_forest import compile_forest
+from core.model_registry import ModelRegistry, atomic_dump
 
 MODEL_FILE = 'solar_model.joblib'
+FEATURES = ['temperature', 'irradiance', 'humidity', 'cloud_cover']
+
+# Reference panel used to derive the training target from weather
+PANEL_AREA = 1.7
+PANEL_EFFICIENCY = 0.20
+TEMP_COEFFICIENT = -0.004
+MIN_IRRADIANCE = 50
+
+MODEL_BACKENDS = ('random_forest', 'hist_gradient_boosting', 'physics_linear')
+DEFAULT_MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "random_forest")
+
+# Per-location model versions; locations without their own model fall back to MODEL_FILE
+model_registry = ModelRegistry(default_model_file=MODEL_FILE)
+
+def physical_output(weather_data):
+    """Output (W) of the reference panel: irradiance times area and efficiency, derated for temperature."""
+    irradiance = weather_data['irradiance'].to_numpy(dtype=float)
+    temperature = weather_data['temperature'].to_numpy(dtype=float)
+    output = irradiance * PANEL_AREA * PANEL_EFFICIENCY * (1 + (temperature - 25) * TEMP_COEFFICIENT)
+    output[irradiance < MIN_IRRADIANCE] = 0
+    return np.maximum(output, 0)
+
+def build_training_frame(historical_weather):
+    """Historical weather with the ``actual_output`` target the models learn."""
+    df = historical_weather.copy()
+    df['actual_output'] = physical_output(df)
+    return df
+
+class PhysicsResidualModel:
+    """
+    Closed-form backend: the reference-panel physics model plus a linear least-squares
+    correction of its residual on the weather features. Trains in milliseconds and
+    stores a handful of coefficients.
+    """
+    def __init__(self):
+        self.coef_ = None
+
+    @staticmethod
+    def _design_matrix(X):
+        return np.column_stack([np.ones(len(X))] + [X[name].to_numpy(dtype=float) for name in FEATURES])
+
+    def fit(self, X, y):
+        residual = np.asarray(y, dtype=float) - physical_output(X)
+        self.coef_, *_ = np.linalg.lstsq(self._design_matrix(X), residual, rcond=None)
+        return self
+
+    def predict(self, X):
+        return np.maximum(physical_output(X) + self._design_matrix(X) @ self.coef_, 0)
+
+def _build_model(backend, n_jobs=None):
+    if backend == 'random_forest':
+        return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    if backend == 'hist_gradient_boosting':
+        return HistGradientBoostingRegressor(max_iter=200, random_state=42)
+    if backend == 'physics_linear':
+        return PhysicsResidualModel()
+    raise ValueError(f"Unknown model backend '{backend}'; expected one of {', '.join(MODEL_BACKENDS)}")
 
 class SimpleSolarPredictor:
     """A simple machine learning model to predict solar output."""
     # FIX: Correctly indented __init__ method
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.features = ['temperature', 'irradiance', 'humidity', 'cloud_cover']
+    def __init__(self, n_jobs=None, backend=DEFAULT_MODEL_BACKEND):
+        self.backend = backend
+        self.model = _build_model(backend, n_jobs)
+        self.features = list(FEATURES)
         self.target = 'actual_output'
 
     # FIX: Correctly indented train method
@@ -28,42 +87,56 @@ class SimpleSolarPredictor:
         X_pred = weather_data[self.features]
         return self.model.predict(X_pred)
 
-@lru_cache(maxsize=1)
-def load_model():
-    """Loads the pre-trained model from disk."""
-    print("Attempting to load model from disk...")
-    if os.path.exists(MODEL_FILE):
-        try:
-            model = joblib.load(MODEL_FILE)
-            print("Model loaded successfully.")
-            return model
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            return None
-    print("Model file not found.")
-    return None
-    
-def train_and_save_model(location, historical_weather):
-    """Trains and saves the model for a given location using provided weather data."""
+def predict_output(model, weather_data):
+    """
+    Predicts with a model from ``load_model``, whatever its backend. Forests go through
+    their compiled form; scikit-learn estimators, which check column names, get just the
+    feature columns.
+    """
+    model = compile_forest(model)
+    if hasattr(model, 'feature_names_in_') and weather_data.columns.tolist() != FEATURES:
+        weather_data = weather_data[FEATURES]
+    return model.predict(weather_data)
+
+def load_model(location=None):
+    """
+    Loads the model for ``location`` (or the default model) through the hot-reloading registry.
+    Forests saved by ``train_and_save_model`` come back as memory-mapped ``CompiledForest``s;
+    older files hold the scikit-learn forest itself. Use ``predict_output`` with either.
+    """
+    try:
+        model = model_registry.get(location)
+        if model is None:
+            print("Model file not found.")
+        return model
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        return None
+
+def train_and_save_model(location, historical_weather, set_default=False, n_jobs=None, backend=DEFAULT_MODEL_BACKEND):
+    """
+    Trains and saves a new model version for a given location using provided weather data.
+    With ``set_default`` it also becomes the fallback model for locations without their own.
+    ``backend`` is one of ``MODEL_BACKENDS``; ``n_jobs`` is passed to the random forest,
+    where -1 fits trees on every core.
+    """
     try:
         if historical_weather.empty:
             print("Failed to use historical data, cannot train model.")
             return None
-        
-        df = historical_weather.copy()
-        panel_area = 1.7
-        panel_efficiency = 0.20
-        temp_coeff = -0.004
-        df['actual_output'] = (df['irradiance'] * panel_area * panel_efficiency * (1 + (df['temperature'] - 25) * temp_coeff))
-        df.loc[df['irradiance'] < 50, 'actual_output'] = 0
-        df['actual_output'] = df['actual_output'].clip(lower=0)
-        
-        predictor = SimpleSolarPredictor()
+
+        df = build_training_frame(historical_weather)
+
+        predictor = SimpleSolarPredictor(n_jobs=n_jobs, backend=backend)
         trained_model = predictor.train(df)
-        
-        joblib.dump(trained_model, MODEL_FILE)
-        
-        print(f"Model successfully trained and saved for {location}.")
+
+        # Forests are saved flattened and uncompressed so serving workers can memory-map a shared copy
+        stored_model = compile_forest(trained_model)
+        model_registry.save(location, stored_model)
+        if set_default:
+            atomic_dump(stored_model, MODEL_FILE)
+
+        print(f"Model ({backend}) successfully trained and saved for {location}.")
         return location
     except Exception as e:
         print(f"An error occurred during model training: {e}")
@@ -0,0 +1,96 @@
+# File: core/response_encoding.py
+
+from importlib.util import find_spec
+import numpy as np
+import pandas as pd
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.solarsmart.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# The compact formats are offered only when their encoders are installed (Arrow uses orjson for its metadata)
+_HAS_ORJSON = find_spec("orjson") is not None
+_HAS_PYARROW = find_spec("pyarrow") is not None
+RESPONSE_FORMATS = (JSON,) + ((COLUMNAR_JSON,) if _HAS_ORJSON else ()) + ((ARROW_STREAM,) if _HAS_ORJSON and _HAS_PYARROW else ())
+ARROW_PAYLOAD_KEY = b"solarsmart.payload"
+
+def negotiate_format(accept):
+    """
+    The response format picked by an ``Accept`` header: the available media type with the
+    highest q-value, ties going to the earlier one. Anything else, including ``*/*``, gets JSON.
+    """
+    best, best_q = JSON, 0.0
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        if media_type not in RESPONSE_FORMATS:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+def is_table(value):
+    """Tables are DataFrames or ``{column: array}`` dicts of NumPy arrays."""
+    return isinstance(value, pd.DataFrame) or (
+        isinstance(value, dict) and bool(value) and all(isinstance(column, np.ndarray) for column in value.values()))
+
+def to_records(table):
+    """Row-oriented form of a table, as the default JSON responses have always sent it."""
+    if isinstance(table, pd.DataFrame):
+        return table.to_dict(orient='records')
+    names = list(table)
+    values = [[None if value != value else value for value in table[name].tolist()] for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def _columns(table):
+    if isinstance(table, pd.DataFrame):
+        return {str(name): table[name] for name in table.columns}
+    return table
+
+def _json_column(column):
+    """One column as something the JSON encoder writes without a Python object per value."""
+    if isinstance(column, pd.Series):
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            column = column.dt.tz_convert('UTC').dt.tz_localize(None)
+        if column.dtype.kind in 'biufM':
+            return column.to_numpy()
+        return column.astype(object).where(column.notna(), None).tolist()
+    return column if column.dtype.kind in 'biufM' else column.tolist()
+
+def encode_columnar_json(payload):
+    """
+    ``payload`` as JSON with each table sent column-wise: ``{"column": [values, ...]}``.
+    Requires orjson, which writes NumPy arrays directly; missing values become null.
+    """
+    import orjson
+
+    columnar = {key: {name: _json_column(column) for name, column in _columns(value).items()} if is_table(value) else value
+                for key, value in payload.items()}
+    return orjson.dumps(columnar, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS, default=str)
+
+def encode_arrow_stream(payload, primary):
+    """
+    ``payload`` as an Arrow IPC stream. The ``primary`` table is the stream's record batch;
+    every other entry, including smaller tables, travels column-wise as JSON in the schema
+    metadata under ``solarsmart.payload``. Requires pyarrow and orjson.
+    """
+    import pyarrow as pa
+
+    table = payload[primary]
+    if isinstance(table, pd.DataFrame):
+        arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    else:
+        arrow_table = pa.table(table)
+    rest = encode_columnar_json({key: value for key, value in payload.items() if key != primary})
+    arrow_table = arrow_table.replace_schema_metadata({**(arrow_table.schema.metadata or {}), ARROW_PAYLOAD_KEY: rest})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
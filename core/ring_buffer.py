@@ -0,0 +1,51 @@
+# File: core/ring_buffer.py
+
+import numpy as np
+
+class ColumnarRingBuffer:
+    """
+    Fixed-capacity, column-oriented buffer of the newest rows. Each column is one
+    preallocated NumPy array; appends overwrite the oldest rows in place, so memory
+    never grows and ``extend`` costs O(rows appended).
+    """
+    def __init__(self, capacity, dtypes):
+        self.capacity = capacity
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self._next = 0    # slot the next row is written to
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def extend(self, values):
+        """Appends rows given as ``{column: array}``; every column must be present and equally long."""
+        lengths = {len(values[name]) for name in self._columns}
+        if len(lengths) != 1:
+            raise ValueError("All columns must have the same number of rows.")
+        n = lengths.pop()
+        if n == 0:
+            return
+        # Only the newest ``capacity`` rows can survive the write
+        skip = max(0, n - self.capacity)
+        slots = (self._next + skip + np.arange(n - skip)) % self.capacity
+        for name, column in self._columns.items():
+            column[slots] = np.asarray(values[name])[skip:]
+        self._next = (self._next + n) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def tail(self, n=None):
+        """The newest ``n`` rows (all rows by default) as ``{column: array}``, oldest first."""
+        n = self._size if n is None else min(n, self._size)
+        slots = (self._next - n + np.arange(n)) % self.capacity
+        return {name: column[slots] for name, column in self._columns.items()}
+
+    def last(self):
+        """The newest row as ``{column: value}``, or None when empty."""
+        if self._size == 0:
+            return None
+        slot = (self._next - 1) % self.capacity
+        return {name: column[slot] for name, column in self._columns.items()}
@@ -1,29 +1,164 @@
 # File: core/simulator.py
 
-import math
+import numpy as np
 
-def simulate_solar_output(num_panels, panel_wattage, tilt_angle, latitude, 
+CLEANING_EFFICIENCY_MAP = {'Weekly': 0.98, 'Monthly': 0.95, 'Quarterly': 0.90, 'Annually': 0.85}
+DEFAULT_CLEANING_EFFICIENCY = 0.95
+
+SIMULATION_PARAMETERS = ['num_panels', 'panel_wattage', 'tilt_angle', 'latitude',
+                         'azimuth', 'shading_factor', 'cleaning_frequency', 'degradation_rate']
+
+def simulate_solar_output(num_panels, panel_wattage, tilt_angle, latitude,
                          azimuth, shading_factor, cleaning_frequency, degradation_rate):
-    peak_sun_hours = 6.5 - 4 * (abs(latitude) / 90)
-    base_output_per_panel = panel_wattage * peak_sun_hours 
-
-    tilt_difference = abs(tilt_angle - latitude)
-    tilt_efficiency = math.cos(math.radians(tilt_difference))
-    
-    optimal_azimuth = 180 if latitude >= 0 else 0
-    azimuth_difference = abs(azimuth - optimal_azimuth)
-    if azimuth_difference > 90:
-        azimuth_difference = 90
-    azimuth_efficiency = math.cos(math.radians(azimuth_difference))
-    
-    shading_efficiency = 1 - (shading_factor / 100)
-    
-    cleaning_efficiency_map = {'Weekly': 0.98, 'Monthly': 0.95, 'Quarterly': 0.90, 'Annually': 0.85}
-    cleaning_efficiency = cleaning_efficiency_map.get(cleaning_frequency, 0.95)
-    
-    annual_efficiency = 1 - (degradation_rate / 100)
-    
-    total_efficiency = (tilt_efficiency * azimuth_efficiency * shading_efficiency * cleaning_efficiency * annual_efficiency)
-    annual_output = (base_output_per_panel * num_panels * 365 * total_efficiency) / 1000
-    
-    return annual_output
\ No newline at end of file
+    return float(simulate_solar_output_batch(num_panels, panel_wattage, tilt_angle, latitude,
+                                             azimuth, shading_factor, cleaning_frequency, degradation_rate))
+
+def cleaning_efficiency(cleaning_frequency):
+    """Maps a cleaning frequency label (or array of labels) to its efficiency factor."""
+    labels = np.asarray(cleaning_frequency)
+    efficiency = np.full(labels.shape, DEFAULT_CLEANING_EFFICIENCY)
+    for label, value in CLEANING_EFFICIENCY_MAP.items():
+        efficiency[labels == label] = value
+    return efficiency
+
+def simulate_solar_output_batch(num_panels, panel_wattage, tilt_angle, latitude,
+                                azimuth, shading_factor, cleaning_frequency, degradation_rate):
+    """
+    Vectorized ``simulate_solar_output``: every argument may be a scalar or an array, and
+    arrays are broadcast against each other. Returns annual output (kWh) per configuration.
+    """
+    shading_efficiency = 1 - (np.asarray(shading_factor, dtype=float) / 100)
+    annual_efficiency = 1 - (np.asarray(degradation_rate, dtype=float) / 100)
+    loss_efficiency = shading_efficiency * cleaning_efficiency(cleaning_frequency) * annual_efficiency
+    return _lossless_annual_output(num_panels, panel_wattage, tilt_angle, latitude, azimuth) * loss_efficiency
+
+def _lossless_annual_output(num_panels, panel_wattage, tilt_angle, latitude, azimuth):
+    """Annual kWh from the peak-sun-hours heuristic with orientation losses only."""
+    latitude = np.asarray(latitude, dtype=float)
+    peak_sun_hours = 6.5 - 4 * (np.abs(latitude) / 90)
+    base_output_per_panel = np.asarray(panel_wattage, dtype=float) * peak_sun_hours
+
+    tilt_difference = np.abs(np.asarray(tilt_angle, dtype=float) - latitude)
+    tilt_efficiency = np.cos(np.radians(tilt_difference))
+
+    optimal_azimuth = np.where(latitude >= 0, 180, 0)
+    azimuth_difference = np.minimum(np.abs(np.asarray(azimuth, dtype=float) - optimal_azimuth), 90)
+    azimuth_efficiency = np.cos(np.radians(azimuth_difference))
+
+    return (base_output_per_panel * np.asarray(num_panels, dtype=float) * 365 * tilt_efficiency * azimuth_efficiency) / 1000
+
+def expand_simulation_grid(**parameter_values):
+    """
+    Builds the Cartesian product of per-parameter value lists as flat, equally sized arrays,
+    ready to pass to ``simulate_solar_output_batch``.
+    """
+    values = [np.asarray(parameter_values[name]) for name in SIMULATION_PARAMETERS]
+    index_grids = np.meshgrid(*[np.arange(len(v)) for v in values], indexing='ij')
+    return {name: v[grid.ravel()] for name, v, grid in zip(SIMULATION_PARAMETERS, values, index_grids)}
+
+# --- Hourly physics-based simulation ---
+
+HOURS_PER_YEAR = 8760
+TEMP_COEFFICIENT = -0.004  # per deg C, same as the training target in core/predictor.py
+NOCT = 45.0
+GROUND_ALBEDO = 0.2
+_DAY_OF_YEAR = np.repeat(np.arange(1, 366), 24)
+_SOLAR_HOUR = np.tile(np.arange(24) + 0.5, 365)  # hour midpoints, local solar time
+_MONTH_INDEX = np.repeat(np.arange('2025-01', '2026-01', dtype='datetime64[D]').astype('datetime64[M]').astype(int) % 12, 24)
+
+def solar_position(latitude, day_of_year, solar_hour):
+    """
+    Returns (cos_zenith, solar_azimuth_deg) for arrays of days and solar hours.
+    Azimuth is measured clockwise from north, the same convention as the panel azimuth.
+    """
+    lat = np.radians(latitude)
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + day_of_year) / 365)
+    hour_angle = np.radians(15 * (solar_hour - 12))
+    cos_zenith = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    azimuth_from_south = np.arctan2(np.sin(hour_angle),
+                                    np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat))
+    return np.clip(cos_zenith, -1, 1), np.degrees(azimuth_from_south) + 180
+
+def clear_sky_irradiance(cos_zenith, day_of_year):
+    """Returns (dni, dhi) in W/m2 from the Meinel clear-sky model with Kasten-Young air mass."""
+    sun_up = cos_zenith > 0
+    zenith_deg = np.degrees(np.arccos(np.where(sun_up, cos_zenith, 1)))
+    air_mass = 1 / (np.where(sun_up, cos_zenith, 1) + 0.50572 * (96.07995 - zenith_deg) ** -1.6364)
+    extraterrestrial = 1367 * (1 + 0.033 * np.cos(2 * np.pi * day_of_year / 365))
+    dni = np.where(sun_up, extraterrestrial * 0.7 ** (air_mass ** 0.678), 0)
+    return dni, 0.1 * dni
+
+def simulate_hourly_yield(num_panels, panel_wattage, tilt_angle, latitude,
+                          azimuth, shading_factor, cleaning_frequency, degradation_rate,
+                          clearness_index=0.75):
+    """
+    Simulates all 8,760 hours of a typical year: solar position, plane-of-array irradiance
+    (beam, isotropic sky diffuse and ground-reflected), NOCT cell temperature derating,
+    then shading, soiling and degradation losses. ``clearness_index`` scales clear-sky
+    irradiance to an average-weather year. Returns hourly, monthly and annual kWh.
+    """
+    cos_zenith, sun_azimuth = solar_position(latitude, _DAY_OF_YEAR, _SOLAR_HOUR)
+    dni, dhi = clear_sky_irradiance(cos_zenith, _DAY_OF_YEAR)
+    dni, dhi = dni * clearness_index, dhi * clearness_index
+    ghi = dni * np.maximum(cos_zenith, 0) + dhi
+
+    tilt = np.radians(tilt_angle)
+    sin_zenith = np.sqrt(1 - cos_zenith ** 2)
+    cos_incidence = cos_zenith * np.cos(tilt) + sin_zenith * np.sin(tilt) * np.cos(np.radians(sun_azimuth - azimuth))
+    beam = dni * np.maximum(cos_incidence, 0)
+    sky_diffuse = dhi * (1 + np.cos(tilt)) / 2
+    ground_reflected = ghi * GROUND_ALBEDO * (1 - np.cos(tilt)) / 2
+    # Shading blocks the direct beam fully and the diffuse sky half as much
+    shading = shading_factor / 100
+    poa = beam * (1 - shading) + sky_diffuse * (1 - shading / 2) + ground_reflected
+
+    # Seasonal and diurnal ambient temperature approximation, then NOCT cell temperature
+    season = np.sign(latitude) * np.sin(2 * np.pi * (_DAY_OF_YEAR - 80) / 365)
+    ambient_temp = (28 - 0.3 * abs(latitude)) + 0.2 * abs(latitude) * season + 5 * np.cos(2 * np.pi * (_SOLAR_HOUR - 15) / 24)
+    cell_temp = ambient_temp + poa * (NOCT - 20) / 800
+    temperature_derate = 1 + TEMP_COEFFICIENT * (cell_temp - 25)
+
+    system_efficiency = cleaning_efficiency(cleaning_frequency) * (1 - degradation_rate / 100)
+    hourly_kwh = num_panels * panel_wattage * (poa / 1000) * temperature_derate * system_efficiency / 1000
+    monthly_kwh = np.bincount(_MONTH_INDEX, weights=hourly_kwh, minlength=12)
+    return {
+        "hourly_kwh": hourly_kwh,
+        "monthly_kwh": monthly_kwh,
+        "annual_kwh": float(hourly_kwh.sum())
+    }
+
+# --- Monte Carlo yield distribution ---
+
+WEATHER_VARIABILITY = 0.05        # std of the annual irradiance multiplier
+SHADING_UNCERTAINTY = 0.2         # relative std of shading_factor, plus 1 percentage point
+DEGRADATION_UNCERTAINTY = 0.25    # relative std of degradation_rate
+SOILING_LOSS_SHAPE = 4.0          # gamma shape of the soiling loss; mean follows cleaning_frequency
+
+def simulate_yield_distribution(num_panels, panel_wattage, tilt_angle, latitude,
+                                azimuth, shading_factor, cleaning_frequency, degradation_rate,
+                                draws=100_000, seed=None, bins=50):
+    """
+    Samples weather, shading, soiling and degradation uncertainty around one scenario and
+    returns annual-yield statistics. P90/P99 are exceedance values, i.e. the yield beaten
+    in 90%/99% of draws.
+    """
+    rng = np.random.default_rng(seed)
+    lossless = _lossless_annual_output(num_panels, panel_wattage, tilt_angle, latitude, azimuth)
+
+    weather = rng.normal(1, WEATHER_VARIABILITY, draws)
+    shading = np.clip(rng.normal(shading_factor, SHADING_UNCERTAINTY * shading_factor + 1, draws), 0, 100)
+    degradation = np.maximum(0, rng.normal(degradation_rate, DEGRADATION_UNCERTAINTY * degradation_rate, draws))
+    mean_soiling_loss = 1 - cleaning_efficiency(cleaning_frequency)
+    soiling_loss = rng.gamma(SOILING_LOSS_SHAPE, mean_soiling_loss / SOILING_LOSS_SHAPE, draws)
+
+    annual_kwh = (lossless * np.maximum(weather, 0) * (1 - shading / 100)
+                  * np.clip(1 - soiling_loss, 0, 1) * (1 - degradation / 100))
+    p50, p90, p99 = np.percentile(annual_kwh, [50, 10, 1])
+    counts, edges = np.histogram(annual_kwh, bins=bins)
+    return {
+        "draws": draws,
+        "mean_kwh": float(annual_kwh.mean()),
+        "std_kwh": float(annual_kwh.std()),
+        "p50_kwh": float(p50), "p90_kwh": float(p90), "p99_kwh": float(p99),
+        "histogram": {"counts": counts.tolist(), "bin_edges": edges.tolist()}
+    }
\ No newline at end of file
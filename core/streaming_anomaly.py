@@ -0,0 +1,115 @@
+# File: core/streaming_anomaly.py
+
+from collections import deque
+from math import sqrt
+
+STREAMING_FEATURES = ('power', 'voltage', 'current')
+
+def _as_list(values):
+    # Plain Python floats are much cheaper to do scalar math on than NumPy scalars
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+class StreamingAnomalyDetector:
+    """
+    Online anomaly detection for live readings.
+
+    Each panel keeps an exponentially weighted mean and variance per feature, a few floats
+    in all, so scoring a reading is O(1) in time and memory however long the feed runs.
+    A reading's score is its largest absolute z-score against the panel's baseline; once
+    a panel has seen ``warmup`` readings, scores of ``threshold`` or more raise an anomaly
+    event. The reading is then folded into the baseline with its deviation clipped to
+    ``threshold`` standard deviations, so a single spike cannot drag the baseline while a
+    lasting level shift is still absorbed over time.
+    """
+    def __init__(self, features=STREAMING_FEATURES, alpha=0.05, threshold=4.0, warmup=20, min_std=1e-6, max_events=1000):
+        self.features = list(features)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.events = deque(maxlen=max_events)   # most recent anomaly events, oldest first
+        self.readings_scored = 0
+        self.anomalies_detected = 0
+        # panel id -> [readings seen, mean_0, var_0, mean_1, var_1, ...]
+        self._baselines = {}
+
+    def update(self, panel_id, values, timestamp=None):
+        """
+        Scores one reading, given as feature values in ``features`` order (None or NaN for
+        missing ones), then updates the panel's baseline. Returns the anomaly event, if any.
+        """
+        state = self._baselines.get(panel_id)
+        if state is None:
+            state = self._baselines[panel_id] = [0] + [float('nan'), 0.0] * len(self.features)
+        alpha, threshold, min_std = self.alpha, self.threshold, self.min_std
+        warmed_up = state[0] >= self.warmup
+
+        worst_z, worst = 0.0, -1
+        for i, x in enumerate(values):
+            if x is None or x != x:
+                continue
+            j = 2 * i + 1
+            mean = state[j]
+            if mean != mean:
+                state[j] = x
+                continue
+            var = state[j + 1]
+            std = sqrt(var) if var > min_std * min_std else min_std
+            diff = x - mean
+            z = abs(diff) / std
+            if z > worst_z:
+                worst_z, worst = z, i
+            if warmed_up:
+                limit = threshold * std
+                diff = limit if diff > limit else -limit if diff < -limit else diff
+            increment = alpha * diff
+            state[j] = mean + increment
+            state[j + 1] = (1 - alpha) * (var + diff * increment)
+        state[0] += 1
+        self.readings_scored += 1
+
+        if not warmed_up or worst_z < threshold:
+            return None
+        expected = state[2 * worst + 1]
+        event = {
+            "panel_id": panel_id, "timestamp": timestamp, "feature": self.features[worst],
+            "value": values[worst], "expected": expected, "z_score": worst_z
+        }
+        self.anomalies_detected += 1
+        self.events.append(event)
+        return event
+
+    def update_columns(self, panel_ids, timestamps, columns):
+        """
+        Replays a batch of readings in order. ``columns`` maps each feature to a sequence of
+        values; a scalar ``panel_ids`` applies to every reading. Returns the anomaly events.
+        """
+        n = len(timestamps)
+        if isinstance(panel_ids, str) or not hasattr(panel_ids, '__len__'):
+            panel_ids = [panel_ids] * n
+        rows = zip(*[_as_list(columns[name]) if name in columns else [None] * n for name in self.features])
+        update = self.update
+        events = []
+        for panel_id, timestamp, values in zip(panel_ids, timestamps, rows):
+            event = update(panel_id, values, timestamp)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def baseline(self, panel_id):
+        """The panel's current baseline as ``{feature: {"mean", "std"}}``, or None if unseen."""
+        state = self._baselines.get(panel_id)
+        if state is None:
+            return None
+        return {name: {"mean": state[2 * i + 1], "std": sqrt(state[2 * i + 2])} for i, name in enumerate(self.features)}
+
+    def recent_events(self, n=None):
+        """The newest ``n`` anomaly events, newest first."""
+        events = list(self.events)[::-1]
+        return events if n is None else events[:n]
+
+    def stats(self):
+        return {
+            "panels": len(self._baselines), "readings_scored": self.readings_scored,
+            "anomalies_detected": self.anomalies_detected
+        }
@@ -0,0 +1,80 @@
+# File: core/telemetry_hub.py
+
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def sse_message(event, payload):
+    """Encodes one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+class _Channel:
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+
+class TelemetryHub:
+    """
+    Fans the metrics ingester's updates out to any number of streaming clients.
+
+    Subscribers with the same key (for example a city and a tariff) share a channel. Each
+    channel waits on the ingester, builds one update per batch of new readings with
+    ``build_update(key, new_records)`` and hands the same encoded message to every
+    subscriber, so upstream queries and per-update work stay flat as viewers grow. A
+    channel's task runs only while it has subscribers; slow subscribers lose their oldest
+    queued updates rather than holding everyone else back.
+    """
+    def __init__(self, ingester, build_update, queue_size=16, heartbeat_interval=15.0):
+        self.ingester = ingester
+        self.build_update = build_update
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self._channels = {}
+
+    def subscriber_counts(self):
+        return {str(key): len(channel.subscribers) for key, channel in self._channels.items()}
+
+    async def subscribe(self, key, snapshot_rows=None):
+        """
+        Async generator of SSE messages for ``key``: a ``snapshot`` built from the newest
+        ``snapshot_rows`` readings, then an ``update`` per batch of new readings, with
+        keep-alive comments while idle. Readings may repeat across the snapshot and the
+        first update; clients should skip any at or before the newest ``created_at`` they hold.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        channel = self._channels.setdefault(key, _Channel())
+        channel.subscribers.add(queue)
+        if channel.task is None:
+            # Counted now, not when the task first runs, so a poll landing in between is not lost
+            channel.task = asyncio.get_running_loop().create_task(self._pump(key, channel, self.ingester.rows_ingested))
+        try:
+            snapshot = await self.build_update(key, self.ingester.records(snapshot_rows))
+            yield sse_message("snapshot", snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+        finally:
+            channel.subscribers.discard(queue)
+            if not channel.subscribers and self._channels.get(key) is channel:
+                del self._channels[key]
+                channel.task.cancel()
+
+    async def _pump(self, key, channel, rows_seen):
+        while True:
+            await self.ingester.wait_for_rows(rows_seen)
+            rows_seen, new_records = self.ingester.records_after(rows_seen)
+            try:
+                message = sse_message("update", await self.build_update(key, new_records))
+            except Exception as e:
+                logger.error(f"Could not build live update for {key}: {e}")
+                continue
+            for queue in list(channel.subscribers):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(message)
@@ -0,0 +1,307 @@
+# File: core/training_jobs.py
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from core.model_registry import location_slug, MODEL_DIR
+from core.predictor import train_and_save_model, DEFAULT_MODEL_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Trainings run one at a time by default; each one fits its forest on every core
+TRAINING_MAX_WORKERS = int(os.environ.get("TRAINING_MAX_WORKERS", "1"))
+TRAINING_N_JOBS = int(os.environ.get("TRAINING_N_JOBS", "-1"))
+MAX_FINISHED_JOBS = 100
+# Job state lives next to the models so every worker process sees the same jobs
+TRAINING_JOBS_DB = os.environ.get("TRAINING_JOBS_DB", os.path.join(MODEL_DIR, "training_jobs.sqlite3"))
+# Unfinished jobs untouched for this long were left behind by a worker that died
+TRAINING_JOB_TIMEOUT = float(os.environ.get("TRAINING_JOB_TIMEOUT", "3600"))
+# Running jobs refresh their updated_at this often, however long they wait on the pool
+TRAINING_JOB_HEARTBEAT = float(os.environ.get("TRAINING_JOB_HEARTBEAT", "60"))
+
+QUEUED, FETCHING_WEATHER, TRAINING, SUCCEEDED, FAILED = "queued", "fetching_weather", "training", "succeeded", "failed"
+STAGE_PROGRESS = {QUEUED: 0.0, FETCHING_WEATHER: 0.1, TRAINING: 0.4, SUCCEEDED: 1.0, FAILED: 1.0}
+
+def _train_in_worker(location, historical_weather, n_jobs, backend):
+    """Runs in a pool process; returns the training result and the time spent fitting and saving."""
+    started = time.perf_counter()
+    result = train_and_save_model(location, historical_weather, n_jobs=n_jobs, backend=backend)
+    return result, time.perf_counter() - started
+
+class TrainingJob:
+    """State of one retraining request, as reported by the status endpoint."""
+    COLUMNS = ("job_id", "slug", "location", "backend", "status", "error", "result",
+               "created_at", "finished_at", "updated_at", "timings")
+
+    def __init__(self, location, backend=DEFAULT_MODEL_BACKEND):
+        self.job_id = uuid.uuid4().hex
+        self.location = location
+        self.backend = backend
+        self.status = QUEUED
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.timings = {}
+
+    @property
+    def slug(self):
+        return location_slug(self.location)
+
+    def to_row(self):
+        return (self.job_id, self.slug, self.location, self.backend, self.status, self.error,
+                json.dumps(self.result), self.created_at, self.finished_at, time.time(), json.dumps(self.timings))
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(zip(cls.COLUMNS, row))
+        job = cls(values["location"], values["backend"])
+        job.job_id, job.status, job.error = values["job_id"], values["status"], values["error"]
+        job.result, job.timings = json.loads(values["result"]), json.loads(values["timings"])
+        job.created_at, job.finished_at = values["created_at"], values["finished_at"]
+        return job
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "location": self.location,
+            "backend": self.backend,
+            "status": self.status,
+            "progress": STAGE_PROGRESS[self.status],
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "timings": {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+        }
+
+class TrainingJobStore:
+    """
+    Training jobs in one SQLite file shared by every worker process, so a status poll can be
+    answered by any worker and a retrain already running in another worker is reused rather
+    than duplicated. The file is created on first use. Unfinished jobs not updated for
+    ``stale_after`` seconds belonged to a worker that died; they are marked failed when found.
+    """
+    def __init__(self, db_path=TRAINING_JOBS_DB, stale_after=TRAINING_JOB_TIMEOUT):
+        self.db_path = db_path
+        self.stale_after = stale_after
+        self._ready = False
+
+    def _connect(self):
+        """A short-lived connection in autocommit mode; transactions are opened explicitly."""
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS training_jobs ("
+                         " job_id TEXT PRIMARY KEY, slug TEXT NOT NULL, location TEXT NOT NULL, backend TEXT NOT NULL,"
+                         " status TEXT NOT NULL, error TEXT, result TEXT, created_at REAL NOT NULL, finished_at REAL,"
+                         " updated_at REAL NOT NULL, timings TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS training_jobs_slug ON training_jobs (slug, backend, status)")
+            self._ready = True
+        return conn
+
+    def claim(self, job):
+        """
+        Stores ``job`` unless an unfinished job for the same location and backend exists; returns
+        that job, or None when ``job`` was stored. Runs in one write transaction, so two workers
+        never both start the same retrain.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE training_jobs SET status = ?, error = ?, finished_at = ? "
+                             "WHERE slug = ? AND backend = ? AND status NOT IN (?, ?) AND updated_at < ?",
+                             (FAILED, "Abandoned by its worker process.", time.time(), job.slug, job.backend,
+                              SUCCEEDED, FAILED, time.time() - self.stale_after))
+                row = conn.execute(f"SELECT {', '.join(TrainingJob.COLUMNS)} FROM training_jobs "
+                                   "WHERE slug = ? AND backend = ? AND status NOT IN (?, ?) ORDER BY created_at LIMIT 1",
+                                   (job.slug, job.backend, SUCCEEDED, FAILED)).fetchone()
+                if row is None:
+                    conn.execute(f"INSERT INTO training_jobs VALUES ({', '.join('?' * len(TrainingJob.COLUMNS))})",
+                                 job.to_row())
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return TrainingJob.from_row(row) if row is not None else None
+
+    def save(self, job):
+        conn = self._connect()
+        try:
+            conn.execute(f"INSERT OR REPLACE INTO training_jobs VALUES ({', '.join('?' * len(TrainingJob.COLUMNS))})",
+                         job.to_row())
+        finally:
+            conn.close()
+
+    def touch(self, job_id):
+        """Marks an unfinished job as still alive."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE training_jobs SET updated_at = ? WHERE job_id = ? AND status NOT IN (?, ?)",
+                         (time.time(), job_id, SUCCEEDED, FAILED))
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(TrainingJob.COLUMNS)} FROM training_jobs WHERE job_id = ?",
+                               (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return TrainingJob.from_row(row) if row is not None else None
+
+    def prune(self, keep_finished):
+        """Deletes finished jobs beyond the newest ``keep_finished``."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM training_jobs WHERE job_id IN (SELECT job_id FROM training_jobs "
+                         "WHERE status IN (?, ?) ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+                         (SUCCEEDED, FAILED, keep_finished))
+        finally:
+            conn.close()
+
+class TrainingJobQueue:
+    """
+    Runs model retraining in the background so the request that triggers it returns immediately.
+
+    ``load_weather(lat, lon)`` is awaited on the event loop to fetch the training data; the
+    forest is then fitted in a process pool so it neither blocks the loop nor competes with
+    request handling for the GIL. Job state is kept in a ``TrainingJobStore`` shared by all
+    worker processes: a retrain for a location and backend that already has a queued or
+    running job, in any worker, returns that job instead of starting another, and any worker
+    can report on any job. Finished jobs are kept for polling until ``max_finished_jobs`` newer ones have completed.
+    While a job waits, on the weather or on the pool, it is marked alive every ``heartbeat_interval``
+    seconds so it is never taken for abandoned. Store access runs in a thread, off the event loop.
+    """
+    def __init__(self, load_weather, max_workers=TRAINING_MAX_WORKERS, n_jobs=TRAINING_N_JOBS,
+                 max_finished_jobs=MAX_FINISHED_JOBS, store=None, heartbeat_interval=TRAINING_JOB_HEARTBEAT):
+        self.load_weather = load_weather
+        self.max_workers = max_workers
+        self.n_jobs = n_jobs
+        self.max_finished_jobs = max_finished_jobs
+        self.heartbeat_interval = heartbeat_interval
+        self.store = store or TrainingJobStore()
+        self._tasks = set()
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            # spawn avoids forking a process that already runs the event loop and worker threads
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def submit(self, location, lat, lon, backend=None):
+        """
+        Queues a retrain for ``location`` and returns ``(job, created)``; ``created`` is False
+        when an in-flight job for the same location and backend was reused.
+        """
+        job = TrainingJob(location, backend or DEFAULT_MODEL_BACKEND)
+        active = await asyncio.to_thread(self.store.claim, job)
+        if active is not None:
+            return active, False
+
+        task = asyncio.get_running_loop().create_task(self._run(job, lat, lon))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    async def _set_status(self, job, status):
+        job.status = status
+        await asyncio.to_thread(self.store.save, job)
+
+    async def _keep_alive(self, job, awaitable):
+        """Awaits ``awaitable``, marking ``job`` alive in the store every ``heartbeat_interval`` seconds."""
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.heartbeat_interval)
+                if done:
+                    return task.result()
+                try:
+                    await asyncio.to_thread(self.store.touch, job.job_id)
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not refresh training job {job.job_id}: {e}")
+        finally:
+            # Only has an effect when the job itself was cancelled mid-wait
+            task.cancel()
+
+    async def _run(self, job, lat, lon):
+        started = time.perf_counter()
+        try:
+            await self._set_status(job, FETCHING_WEATHER)
+            historical_weather = await self._keep_alive(job, self.load_weather(lat, lon))
+            job.timings["fetch_weather_s"] = time.perf_counter() - started
+
+            await self._set_status(job, TRAINING)
+            training_started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            result, fit_seconds = await self._keep_alive(job, loop.run_in_executor(
+                self.pool, _train_in_worker, job.location, historical_weather, self.n_jobs, job.backend))
+            # Includes waiting behind other jobs, worker start-up and shipping the data to the worker
+            job.timings["pool_wait_s"] = time.perf_counter() - training_started - fit_seconds
+            job.timings["train_s"] = fit_seconds
+            if result is None:
+                raise RuntimeError("Model training failed.")
+            job.result = {"location": result, "training_rows": len(historical_weather)}
+            job.status = SUCCEEDED
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); start a fresh pool for later jobs
+            logger.error(f"Training job {job.job_id} for {job.location} lost its worker process: {e}")
+            self._reset_pool()
+            job.error = str(e)
+            job.status = FAILED
+        except Exception as e:
+            logger.error(f"Training job {job.job_id} for {job.location} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        except asyncio.CancelledError:
+            # Recorded as failed so the location is not blocked until the job times out; saved
+            # in place because the loop is shutting down and may not run a thread hand-off
+            job.error = "Cancelled when the server shut down."
+            job.status = FAILED
+            self._finish(job, started)
+            raise
+        await asyncio.to_thread(self._finish, job, started)
+
+    def _finish(self, job, started):
+        job.timings["total_s"] = time.perf_counter() - started
+        job.finished_at = time.time()
+        try:
+            self.store.save(job)
+            self.store.prune(self.max_finished_jobs)
+        except sqlite3.Error as e:
+            logger.error(f"Could not record the outcome of training job {job.job_id}: {e}")
+
+    def _reset_pool(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
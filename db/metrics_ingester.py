@@ -0,0 +1,203 @@
+# File: db/metrics_ingester.py
+
+import os
+import asyncio
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from core.ring_buffer import ColumnarRingBuffer
+from core.streaming_anomaly import StreamingAnomalyDetector
+from db.supabase_client import fetch_rows_since, ROW_ID_COLUMN
+
+logger = logging.getLogger(__name__)
+
+METRICS_TABLE = "metrics"
+METRIC_COLUMNS = ['power', 'voltage', 'current', 'temperature', 'humidity']
+METRICS_BUFFER_SIZE = int(os.environ.get("METRICS_BUFFER_SIZE", "5000"))
+METRICS_POLL_INTERVAL = float(os.environ.get("METRICS_POLL_INTERVAL", "5"))
+LOCAL_TIMEZONE = "Asia/Kolkata"
+PANEL_COLUMN = "panel_id"   # optional; readings without it are scored as one panel named after the table
+
+class MetricsIngester:
+    """
+    Keeps the newest rows of the Supabase ``metrics`` table in memory.
+
+    Each ``poll`` asks only for rows after the last ``(created_at, id)`` seen and appends
+    them to a fixed-size columnar ring buffer. Timestamps are parsed and formatted once,
+    on arrival, and running aggregates (the latest reading and today's integrated energy
+    in local time) are updated from the new rows alone. Readers therefore do O(1) work,
+    or O(rows requested) for ``readings``, however much history has streamed past.
+    ``fetch_rows(table, since, limit)`` is swappable so tests can use a stand-in source.
+    New rows are also scored by ``anomaly_detector`` (a ``StreamingAnomalyDetector``), if given.
+    """
+    def __init__(self, table_name=METRICS_TABLE, capacity=METRICS_BUFFER_SIZE, poll_interval=METRICS_POLL_INTERVAL,
+                 fetch_rows=fetch_rows_since, page_size=1000, timezone=LOCAL_TIMEZONE, anomaly_detector=None):
+        self.table_name = table_name
+        self.poll_interval = poll_interval
+        self.fetch_rows = fetch_rows
+        self.page_size = page_size
+        self.timezone = timezone
+        self.anomaly_detector = anomaly_detector
+        dtypes = dict({name: np.float64 for name in METRIC_COLUMNS},
+                      created_at_ns=np.int64, created_at=object, local_time=object)
+        self.buffer = ColumnarRingBuffer(capacity, dtypes)
+        self.version = 0               # bumped whenever new rows arrive
+        self.rows_ingested = 0
+        self._cursor = None            # (created_at, id) of the newest row, exactly as the source returned them
+        self._energy_day = None        # local midnight (ns) the running energy total belongs to
+        self._energy_today_mwh = 0.0
+        self._lock = threading.Lock()
+        self._task = None
+        self._failing = False
+        self._update_event = None      # set (on the event loop) when a background poll brings new rows
+
+    def poll(self):
+        """Fetches and ingests every row after the cursor; returns how many arrived."""
+        total = 0
+        while True:
+            # The first fetch seeds the buffer with the newest rows; later ones page forward
+            seeding = self._cursor is None
+            try:
+                rows = self.fetch_rows(self.table_name, self._cursor, self.buffer.capacity if seeding else self.page_size)
+            except Exception as e:
+                if not self._failing:
+                    logger.error(f"Could not fetch new '{self.table_name}' rows: {e}")
+                self._failing = True
+                return total
+            self._failing = False
+            if rows:
+                self._ingest(rows)
+                total += len(rows)
+            if seeding or len(rows) < self.page_size:
+                return total
+
+    def _ingest(self, rows):
+        frame = pd.DataFrame(rows)
+        # pandas may infer second or microsecond resolution from the strings; the integer math below needs ns
+        created_at = pd.DatetimeIndex(pd.to_datetime(frame['created_at'], utc=True)).as_unit('ns')
+        local_time = created_at.tz_convert(self.timezone)
+        created_at_ns = created_at.asi8
+        values = {name: pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+                  if name in frame else np.full(len(frame), np.nan) for name in METRIC_COLUMNS}
+
+        with self._lock:
+            # Energy is power times the time since the previous reading, accumulated per local day;
+            # the first reading of a day counts only from local midnight, not over the night's gap
+            previous_ns = self.buffer.last()['created_at_ns'] if len(self.buffer) else created_at_ns[0]
+            day_keys = local_time.normalize().asi8
+            starts = np.maximum(np.concatenate(([previous_ns], created_at_ns[:-1])), day_keys)
+            delta_hours = (created_at_ns - starts) / 3.6e12
+            energy_mwh = np.nan_to_num(values['power']) * 1000 * delta_hours
+            last_day = day_keys[-1]
+            carried = self._energy_today_mwh if self._energy_day == last_day else 0.0
+            self._energy_today_mwh = carried + energy_mwh[day_keys == last_day].sum()
+            self._energy_day = last_day
+
+            created_at_iso = [ts.isoformat() for ts in created_at]
+            self.buffer.extend(dict(values, created_at_ns=created_at_ns, created_at=created_at_iso,
+                                    local_time=[ts.isoformat() for ts in local_time]))
+            if self.anomaly_detector is not None:
+                panel_ids = frame[PANEL_COLUMN].tolist() if PANEL_COLUMN in frame else self.table_name
+                self.anomaly_detector.update_columns(panel_ids, created_at_iso, values)
+            self._cursor = (rows[-1]['created_at'], rows[-1][ROW_ID_COLUMN])
+            self.rows_ingested += len(frame)
+            self.version += 1
+
+    def latest(self):
+        """The newest reading as a dict, or None before any data has arrived."""
+        with self._lock:
+            row = self.buffer.last()
+        if row is None:
+            return None
+        latest = {name: None if np.isnan(row[name]) else float(row[name]) for name in METRIC_COLUMNS}
+        return dict(latest, created_at=row['created_at'], local_time=row['local_time'])
+
+    def energy_today_mwh(self):
+        """Energy integrated over today's readings (local time); 0 until today's first reading."""
+        today = pd.Timestamp.now(tz=self.timezone).normalize().value
+        with self._lock:
+            return self._energy_today_mwh if self._energy_day == today else 0.0
+
+    def readings(self, n=None):
+        """The newest ``n`` readings as columns (oldest first), copied out of the buffer."""
+        with self._lock:
+            return self.buffer.tail(n)
+
+    def readings_before(self, before=None, limit=200):
+        """
+        Up to ``limit`` buffered readings older than row number ``before`` (the newest when
+        None), newest first, plus the row number to continue from, or None when no older
+        readings are buffered. Row numbers count every row ever ingested, so they stay valid
+        while new rows arrive; rows already overwritten in the buffer are simply gone.
+        """
+        with self._lock:
+            readings = self.buffer.tail()
+            first_row = self.rows_ingested - len(self.buffer)
+        size = len(readings['created_at_ns'])
+        end = size if before is None else min(max(before - first_row, 0), size)
+        start = max(0, end - limit)
+        page = {name: column[start:end][::-1] for name, column in readings.items()}
+        return page, first_row + start if start > 0 else None
+
+    def records(self, n=None, columns=None):
+        """The newest ``n`` readings as JSON-ready dicts; missing values become None."""
+        return self._to_records(self.readings(n), columns)
+
+    def records_after(self, rows_seen, columns=None):
+        """
+        ``(rows_ingested, records)`` for the readings that arrived after the first ``rows_seen``,
+        read atomically; readings already overwritten in the buffer are skipped.
+        """
+        with self._lock:
+            rows_ingested = self.rows_ingested
+            readings = self.buffer.tail(min(rows_ingested - rows_seen, self.buffer.capacity))
+        return rows_ingested, self._to_records(readings, columns)
+
+    @staticmethod
+    def _to_records(readings, columns=None):
+        columns = columns or ['created_at', 'local_time'] + METRIC_COLUMNS
+        values = [[None if value != value else value for value in readings[name].tolist()] for name in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def recent_anomalies(self, n=None):
+        """The newest ``n`` anomaly events from the live feed, newest first."""
+        if self.anomaly_detector is None:
+            return []
+        with self._lock:
+            return self.anomaly_detector.recent_events(n)
+
+    async def wait_for_rows(self, rows_seen):
+        """Waits until a background poll has ingested more than ``rows_seen`` rows in total."""
+        while self.rows_ingested <= rows_seen:
+            if self._update_event is None:
+                self._update_event = asyncio.Event()
+            await self._update_event.wait()
+
+    def _notify(self):
+        if self._update_event is not None:
+            self._update_event.set()
+            self._update_event = None
+
+    async def _run(self):
+        while True:
+            if await asyncio.to_thread(self.poll):
+                self._notify()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Starts polling in the background on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Shared instance polled for the lifetime of the FastAPI app
+metrics_ingester = MetricsIngester(anomaly_detector=StreamingAnomalyDetector())
@@ -1,11 +1,9 @@
 # File: db/supabase_client.py
 
 import os
-import pandas as pd
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import logging
-from cachetools import cached, TTLCache
 
 # --- Setup ---
 logging.basicConfig(level=logging.INFO)
@@ -23,26 +21,23 @@ except Exception as e:
     logger.error(f"Error initializing Supabase client: {e}")
     supabase = None
 
-# Create a cache that expires every 5 seconds
-supabase_cache = TTLCache(maxsize=10, ttl=5)
+# Unique, increasing column that orders rows sharing a created_at
+ROW_ID_COLUMN = "id"
 
-@cached(cache=supabase_cache)
-def fetch_supabase_data(table_name: str, limit: int = 200):
-    """Fetches the last N rows of data from the Supabase table."""
+def fetch_rows_since(table_name: str, since=None, limit: int = 1000):
+    """
+    Rows of ``table_name`` after the ``(created_at, id)`` position ``since``, oldest first, at most
+    ``limit``. Paging on the pair rather than ``created_at`` alone neither skips nor repeats rows
+    that share a timestamp. Without ``since`` it returns the newest ``limit`` rows. Raises on
+    failure so callers can retry.
+    """
     if supabase is None:
-        logger.error("Supabase client is not initialized. Cannot fetch data.")
-        return pd.DataFrame()
-        
-    try:
-        response = supabase.table(table_name).select("*").order("created_at", desc=True).limit(limit).execute()
-        
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            df = df.sort_values('created_at').reset_index(drop=True)
-            return df
-        return pd.DataFrame()
-        
-    except Exception as e:
-        logger.error(f"Error fetching data from Supabase: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        raise RuntimeError("Supabase client is not initialized.")
+    query = supabase.table(table_name).select("*")
+    if since is None:
+        newest = query.order("created_at", desc=True).order(ROW_ID_COLUMN, desc=True).limit(limit).execute()
+        return list(reversed(newest.data or []))
+    created_at, row_id = since
+    after = (f'created_at.gt."{created_at}",'
+             f'and(created_at.eq."{created_at}",{ROW_ID_COLUMN}.gt."{row_id}")')
+    return query.or_(after).order("created_at").order(ROW_ID_COLUMN).limit(limit).execute().data or []
\ No newline at end of file
@@ -0,0 +1,45 @@
+# File: generate_synthetic_data.py
+
+import argparse
+import time
+from core.data_generator import SolarDataGenerator
+
+def write_parquet_dataset(output_dir, num_panels, days, seed=None, days_per_chunk=1, rows_per_chunk=None):
+    """
+    Streams synthetic readings chunk by chunk into a Parquet dataset partitioned by date,
+    so only one chunk is ever held in memory.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("pyarrow is required for Parquet output: pip install pyarrow")
+
+    total_rows = 0
+    chunks = SolarDataGenerator.generate_chunks(num_panels, days, seed=seed,
+                                                days_per_chunk=days_per_chunk, rows_per_chunk=rows_per_chunk)
+    for chunk_number, chunk in enumerate(chunks):
+        chunk['date'] = chunk['datetime'].dt.strftime('%Y-%m-%d')
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        pq.write_to_dataset(table, root_path=output_dir, partition_cols=['date'],
+                            basename_template=f"part-{chunk_number:05d}-{{i}}.parquet")
+        total_rows += len(chunk)
+        print(f"Wrote chunk {chunk_number + 1}: {len(chunk):,} rows (total {total_rows:,})")
+    return total_rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream synthetic solar readings into a date-partitioned Parquet dataset.")
+    parser.add_argument("output_dir", help="Directory for the Parquet dataset.")
+    parser.add_argument("--panels", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--days-per-chunk", type=int, default=1)
+    parser.add_argument("--rows-per-chunk", type=int, default=None,
+                        help="Maximum rows per chunk: whole days of the fleet when they fit, otherwise one day "
+                             "of as many panels as fit; overrides --days-per-chunk.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = write_parquet_dataset(args.output_dir, args.panels, args.days, seed=args.seed,
+                                 days_per_chunk=args.days_per_chunk, rows_per_chunk=args.rows_per_chunk)
+    print(f"--- Done: {rows:,} rows written to '{args.output_dir}' in {time.perf_counter() - start:.1f}s ---")
@@ -1,7 +1,11 @@
 # File: main.py (The final, complete, and organized version)
 
 # --- 1. Standard Library Imports ---
-from typing import List, Optional
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+import os
 from datetime import datetime
 import traceback
 import pytz
@@ -9,24 +13,48 @@ import pytz
 # --- 2. Third-Party Imports ---
 import pandas as pd
 import numpy as np
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from geopy.geocoders import Nominatim
+from fastapi.responses import StreamingResponse
 
 # --- 3. Local Application Imports ---
-from api.weather_api import WeatherAPI
-from core.anomaly_detector import EnhancedAnomalyDetector
+from api.async_weather_api import async_weather_api
+from api.geocoding import geocoder
+from core.anomaly_detector import (EnhancedAnomalyDetector, PanelHealthAccumulator, load_anomaly_detector,
+                                   anomaly_model_registry, ANOMALY_MODEL_FILE)
+from core.caching import cache_stats
 from core.data_generator import SolarDataGenerator
-from core.predictor import load_model, SimpleSolarPredictor, train_and_save_model
-from core.simulator import simulate_solar_output
-from db.supabase_client import fetch_supabase_data
+from core.ingestion import iter_performance_csv, sample_rows
+from core.predictor import load_model, predict_output, MODEL_BACKENDS
+from core.training_jobs import TrainingJobQueue
+from core.downsampling import ChartRowPool, minmax_indices, MIN_SERIES_POINTS
+from core.pagination import ResultStore, encode_cursor, decode_cursor, MAX_PAGE_SIZE
+from core.response_encoding import negotiate_format, is_table, to_records, encode_columnar_json, encode_arrow_stream, COLUMNAR_JSON, ARROW_STREAM
+from core.telemetry_hub import TelemetryHub
+from core.simulator import simulate_solar_output, simulate_solar_output_batch, simulate_hourly_yield, simulate_yield_distribution, expand_simulation_grid, SIMULATION_PARAMETERS
+from db.metrics_ingester import metrics_ingester, METRIC_COLUMNS
 
 # --- App Initialization ---
+# Retraining runs in the background: weather is fetched on the event loop, the forest is fitted in a process pool
+training_jobs = TrainingJobQueue(async_weather_api.get_historical_weather)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Live metrics are pulled incrementally in the background instead of re-queried per request
+    metrics_ingester.start()
+    yield
+    await metrics_ingester.stop()
+    # Release the pooled upstream connections and training processes on shutdown
+    await async_weather_api.aclose()
+    training_jobs.shutdown()
+
 app = FastAPI(
     title="SolarSmart API",
     description="API for solar performance forecasting and analysis.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS Middleware ---
@@ -49,6 +77,10 @@ class ForecastRequest(BaseModel):
     forecast_days: int
     panel_capacity: float
     panel_efficiency: float
+    resolution: Literal['daily', 'hourly'] = 'daily'
+
+class BatchForecastRequest(BaseModel):
+    sites: List[ForecastRequest]
 
 class PredictionRequest(BaseModel):
     lat: float
@@ -64,8 +96,24 @@ class SimulationRequest(BaseModel):
     cleaning_frequency: str
     degradation_rate: float
 
+class SimulationGrid(BaseModel):
+    num_panels: List[int]
+    panel_wattage: List[int]
+    tilt_angle: List[float]
+    latitude: List[float]
+    azimuth: List[float]
+    shading_factor: List[float]
+    cleaning_frequency: List[str]
+    degradation_rate: List[float]
+
+class SimulationSweepRequest(BaseModel):
+    scenarios: Optional[List[SimulationRequest]] = None
+    grid: Optional[SimulationGrid] = None
+    include_outputs: bool = False   # every configuration's output; at most MAX_SWEEP_OUTPUTS of them
+
 class RetrainRequest(BaseModel):
     location: str
+    backend: Optional[str] = None  # one of MODEL_BACKENDS; defaults to MODEL_BACKEND
 
 # --- API Endpoints ---
 
@@ -73,35 +121,160 @@ class RetrainRequest(BaseModel):
 def read_root():
     return {"status": "SolarSmart API is running"}
 
+@app.get("/api/cache-stats")
+def get_cache_stats():
+    """Hit, miss and coalescing counters for the upstream data caches."""
+    return cache_stats()
+
+MAX_HOURLY_FORECAST_DAYS = 16  # Open-Meteo's forecast horizon
+
+def _forecast_request_error(site: ForecastRequest):
+    """Why the upstream API would reject this site's request, or None."""
+    if site.resolution == 'hourly' and not 1 <= site.forecast_days <= MAX_HOURLY_FORECAST_DAYS:
+        return f"Hourly forecasts cover 1 to {MAX_HOURLY_FORECAST_DAYS} days."
+    return None
+
+async def _fetch_forecast_weather(site: ForecastRequest):
+    """Daily or hourly forecast weather for one site, or None if it could not be retrieved."""
+    if site.resolution == 'hourly':
+        weather_data, _, _ = await async_weather_api.get_hourly_weather_forecast(site.location, site.forecast_days)
+    else:
+        weather_data, _, _ = await async_weather_api.get_real_weather_forecast(site.location, site.forecast_days)
+    return weather_data
+
+def _predicted_energy_kwh(site: ForecastRequest, predictions: np.ndarray, periods_per_day=1):
+    """
+    Scales model predictions to the site's energy per period, by panel capacity and efficiency.
+    An hourly prediction is 1/24 of a day's, so hourly values add up to the daily forecast.
+    """
+    return predictions * site.panel_capacity / 10 * site.panel_efficiency / 20 / periods_per_day
+
+def _hourly_forecast_payload(site: ForecastRequest, weather_data: pd.DataFrame, predictions: np.ndarray):
+    """Columnar hourly curves with daily rollups, scaled the same way as the daily forecast."""
+    hourly = weather_data.set_index('date')[['temperature', 'irradiance', 'humidity', 'cloud_cover']].assign(
+        predicted_output_kwh=_predicted_energy_kwh(site, np.maximum(predictions, 0), periods_per_day=24))
+    daily = hourly.resample('D').agg(
+        predicted_output_kwh=('predicted_output_kwh', 'sum'),
+        peak_output_kw=('predicted_output_kwh', 'max'),
+        insolation_kwh_m2=('irradiance', 'sum'),
+        temperature_max=('temperature', 'max'),
+        temperature_min=('temperature', 'min'),
+        humidity_mean=('humidity', 'mean'),
+        cloud_cover_mean=('cloud_cover', 'mean'),
+    )
+    daily['insolation_kwh_m2'] /= 1000
+    return {
+        "location": site.location,
+        "resolution": "hourly",
+        "hourly": {"time": hourly.index.strftime('%Y-%m-%dT%H:%M').tolist(), **hourly.to_dict(orient='list')},
+        "daily": {"date": daily.index.strftime('%Y-%m-%d').tolist(), **daily.to_dict(orient='list')},
+    }
+
+def _forecast_payload(site: ForecastRequest, weather_data: pd.DataFrame, predictions: np.ndarray):
+    """The ``/api/forecast`` response body for one site; leaves ``weather_data`` (a cached frame) untouched."""
+    if site.resolution == 'hourly':
+        return _hourly_forecast_payload(site, weather_data, predictions)
+    dates = [str(date) for date in weather_data['date']]
+    weather_results = weather_data[['temperature', 'irradiance', 'humidity', 'cloud_cover']].assign(date=dates)
+    forecast_results = pd.DataFrame({
+        'date': dates,
+        'predicted_output_kwh': _predicted_energy_kwh(site, predictions)
+    })
+    return {
+        "location": site.location,
+        "weather_data": weather_results[['date', 'temperature', 'irradiance', 'humidity', 'cloud_cover']].to_dict(orient='records'),
+        "energy_forecast": forecast_results.to_dict(orient='records')
+    }
+
 @app.post("/api/forecast")
 async def get_solar_forecast(request: ForecastRequest):
-    """Accepts location and panel details, returns a weather and energy forecast."""
+    """
+    Accepts location and panel details, returns a weather and energy forecast. With
+    ``resolution='hourly'`` it predicts every forecast hour in one batch and returns columnar
+    hourly curves and daily rollups instead of per-day records.
+    """
+    request_error = _forecast_request_error(request)
+    if request_error:
+        raise HTTPException(status_code=400, detail=request_error)
     try:
         # This logic is derived from the forecasting_page in the source file
-        weather_data, _, _ = WeatherAPI.get_real_weather_forecast(request.location, request.forecast_days)
+        weather_data = await _fetch_forecast_weather(request)
         if weather_data is None or weather_data.empty:
             raise HTTPException(status_code=404, detail="Could not retrieve weather data for the specified location.")
 
-        model = load_model() 
+        model = load_model(request.location)
         if model is None:
             raise HTTPException(status_code=500, detail="AI model is not available or failed to load.")
 
-        predictor = SimpleSolarPredictor()
-        predictor.model = model
-        predictions = predictor.predict(weather_data)
-        
-        weather_data['predicted_output_kwh'] = (predictions * request.panel_capacity / 10 * request.panel_efficiency / 20)
-
-        weather_results = weather_data[['date', 'temperature', 'irradiance', 'humidity', 'cloud_cover']].to_dict(orient='records')
-        forecast_results = weather_data[['date', 'predicted_output_kwh']].to_dict(orient='records')
-
-        for item in weather_results: item['date'] = str(item['date'])
-        for item in forecast_results: item['date'] = str(item['date'])
-
-        return { "location": request.location, "weather_data": weather_results, "energy_forecast": forecast_results }
+        predictions = predict_output(model, weather_data)
+        return _forecast_payload(request, weather_data, predictions)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+MAX_BATCH_FORECAST_SITES = 200
+BATCH_FORECAST_CONCURRENCY = 16
+
+@app.post("/api/forecast/batch")
+async def get_batch_solar_forecast(request: BatchForecastRequest):
+    """
+    Forecasts many sites in one call. Weather for all sites is fetched concurrently (at most
+    BATCH_FORECAST_CONCURRENCY at a time), then every site served by the same model is
+    predicted in one batch. Each site gets an ``/api/forecast``-shaped result or its own error.
+    """
+    if not request.sites:
+        raise HTTPException(status_code=400, detail="Provide at least one site.")
+    if len(request.sites) > MAX_BATCH_FORECAST_SITES:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {MAX_BATCH_FORECAST_SITES} sites.")
+
+    results = [None] * len(request.sites)
+    def fail(i, detail):
+        results[i] = {"location": request.sites[i].location, "status": "error", "detail": detail}
+
+    for i, site in enumerate(request.sites):
+        request_error = _forecast_request_error(site)
+        if request_error:
+            fail(i, request_error)
+
+    semaphore = asyncio.Semaphore(BATCH_FORECAST_CONCURRENCY)
+    async def fetch_weather(i, site):
+        if results[i] is not None:
+            return None
+        async with semaphore:
+            return await _fetch_forecast_weather(site)
+    weather_frames = await asyncio.gather(*(fetch_weather(i, site) for i, site in enumerate(request.sites)),
+                                          return_exceptions=True)
+
+    # Sites without their own model share the default one, so most batches need a single predict
+    sites_by_model = {}
+    for i, (site, weather_data) in enumerate(zip(request.sites, weather_frames)):
+        if results[i] is not None:
+            continue
+        if isinstance(weather_data, Exception) or weather_data is None or weather_data.empty:
+            fail(i, "Could not retrieve weather data for the specified location.")
+            continue
+        model = load_model(site.location)
+        if model is None:
+            fail(i, "AI model is not available or failed to load.")
+            continue
+        sites_by_model.setdefault(id(model), (model, []))[1].append(i)
+
+    for model, indices in sites_by_model.values():
+        frames = [weather_frames[i] for i in indices]
+        try:
+            predictions = predict_output(model, pd.concat(frames, ignore_index=True))
+        except Exception as e:
+            for i in indices:
+                fail(i, str(e))
+            continue
+        boundaries = np.cumsum([len(frame) for frame in frames])[:-1]
+        for i, site_predictions in zip(indices, np.split(predictions, boundaries)):
+            results[i] = dict(_forecast_payload(request.sites[i], weather_frames[i], site_predictions), status="ok")
+
+    succeeded = sum(result["status"] == "ok" for result in results)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
 @app.get("/api/dashboard-summary")
 async def get_dashboard_summary():
     """Generates and returns a summary of realistic demo data for the dashboard."""
@@ -136,144 +309,430 @@ async def get_dashboard_summary():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating dashboard data: {str(e)}")
 
-@app.get("/api/ai-twin-summary/{city_name}")
-async def get_ai_twin_summary(city_name: str, price: float = 8.0):
-    """A consolidated endpoint to provide all data for the AI Twin Command Center."""
-    try:
-        # Geocode the city to get lat/lon
-        geolocator = Nominatim(user_agent="solar_smart_api", timeout=10)
-        location_data = geolocator.geocode(city_name)
-        if not location_data:
-            raise HTTPException(status_code=404, detail=f"Location not found: {city_name}")
-        lat, lon = location_data.latitude, location_data.longitude
+SUMMARY_READINGS = 200  # recent readings returned for the trend chart and table
+DEMO_SCALING_FACTOR = 10 / 7047
+
+async def _predict_live_power(city_name: str):
+    """``(predicted_power_w, model)`` for the city's current weather."""
+    # Geocode the city to get lat/lon
+    location_data = await geocoder.geocode_async(city_name)
+    if not location_data:
+        raise HTTPException(status_code=404, detail=f"Location not found: {city_name}")
+
+    model = load_model(city_name)
+    if model is None: raise HTTPException(status_code=500, detail="AI model not available.")
+
+    current_weather = await async_weather_api.get_current_weather(location_data.latitude, location_data.longitude)
+    return predict_output(model, current_weather)[0], model
+
+def _live_kpis(predicted_power_w: float, price: float):
+    """Live metrics plus the performance and impact KPIs derived from them and the prediction."""
+    # Live data from the incrementally updated metrics buffer; no per-request query or re-integration
+    latest_data = {}
+    latest_power_mw = 0
+    actual_energy_mwh_today = metrics_ingester.energy_today_mwh()
+
+    latest = metrics_ingester.latest()
+    if latest is not None:
+        latest_power_mw = (latest['power'] or 0) * 1000
+        latest_data = {
+            "voltage": latest['voltage'], "current": latest['current'] * 1000 if latest['current'] is not None else None,
+            "temperature": latest['temperature'], "humidity": latest['humidity'],
+            "timestamp": latest['local_time']
+        }
 
-        # Fetch Live Data from Supabase
-        live_df = fetch_supabase_data(table_name="metrics", limit=200)
-        
-        latest_data = {}
-        latest_power_mw = 0
-        actual_energy_mwh_today = 0
-
-        if not live_df.empty:
-            live_df['created_at'] = pd.to_datetime(live_df['created_at'], utc=True)
-            live_df['timestamp_kolkata'] = live_df['created_at'].dt.tz_convert('Asia/Kolkata')
-            latest_data_row = live_df.iloc[-1]
-            latest_power_mw = latest_data_row.get('power', 0) * 1000
-            latest_data = {
-                "voltage": latest_data_row.get('voltage', 0), "current": latest_data_row.get('current', 0) * 1000,
-                "temperature": latest_data_row.get('temperature', 0), "humidity": latest_data_row.get('humidity', 0),
-                "timestamp": latest_data_row['timestamp_kolkata'].isoformat()
-            }
-            power_mw_series = live_df['power'].fillna(0) * 1000
-            delta_hours = live_df['timestamp_kolkata'].diff().dt.total_seconds().fillna(0) / 3600.0
-            actual_energy_mwh_today = (power_mw_series * delta_hours).sum()
+    predicted_power_mw_raw = max(0, predicted_power_w * 1000)
+    predicted_power_mw = predicted_power_mw_raw * DEMO_SCALING_FACTOR
+
+    # Perform Performance & Impact Calculations
+    power_loss_mw = max(0, predicted_power_mw - latest_power_mw)
+    power_loss_percent = (power_loss_mw / predicted_power_mw) * 100 if predicted_power_mw > 0 else 0
+    now_kolkata = datetime.now(pytz.timezone('Asia/Kolkata'))
+    daylight_hours_so_far = max(0, (now_kolkata - now_kolkata.replace(hour=6, minute=0)).total_seconds() / 3600)
+    predicted_energy_mwh_today = predicted_power_mw * daylight_hours_so_far
+    revenue_loss_inr = (max(0, predicted_energy_mwh_today - actual_energy_mwh_today) / 1000 / 1000) * price
+    phones_charged_hourly = (predicted_power_w / 15.0) if predicted_power_w else 0
+    ev_km_per_hour = ((predicted_power_w / 1000) * 6) if predicted_power_w else 0
+    co2_avoided_grams_today = (predicted_power_w * daylight_hours_so_far / 1000) * 475.0
+
+    return {
+        "live_metrics": latest_data,
+        "prediction": { "predicted_power_mw": predicted_power_mw },
+        "performance": { "power_difference_mw": power_loss_mw, "percent_difference": power_loss_percent, "est_revenue_loss": revenue_loss_inr },
+        "impact": { "phones_charged_per_hour": phones_charged_hourly, "ev_range_added_per_hour_km": ev_km_per_hour, "co2_avoided_grams_today": co2_avoided_grams_today },
+    }
 
-        # Get AI Prediction
-        model = load_model()
-        if model is None: raise HTTPException(status_code=500, detail="AI model not available.")
-        
-        current_weather = WeatherAPI.get_current_weather(lat, lon)
-        predicted_power_w = model.predict(current_weather)[0]
-        predicted_power_mw_raw = max(0, predicted_power_w * 1000)
-        DEMO_SCALING_FACTOR = 10 / 7047 
-        predicted_power_mw = predicted_power_mw_raw * DEMO_SCALING_FACTOR
-
-        # Perform Performance & Impact Calculations
-        power_loss_mw = max(0, predicted_power_mw - latest_power_mw)
-        power_loss_percent = (power_loss_mw / predicted_power_mw) * 100 if predicted_power_mw > 0 else 0
-        now_kolkata = datetime.now(pytz.timezone('Asia/Kolkata'))
-        daylight_hours_so_far = max(0, (now_kolkata - now_kolkata.replace(hour=6, minute=0)).total_seconds() / 3600)
-        predicted_energy_mwh_today = predicted_power_mw * daylight_hours_so_far
-        revenue_loss_inr = (max(0, predicted_energy_mwh_today - actual_energy_mwh_today) / 1000 / 1000) * price
-        phones_charged_hourly = (predicted_power_w / 15.0) if predicted_power_w else 0
-        ev_km_per_hour = ((predicted_power_w / 1000) * 6) if predicted_power_w else 0
-        co2_avoided_grams_today = (predicted_power_w * daylight_hours_so_far / 1000) * 475.0
+@app.get("/api/ai-twin-summary/{city_name}")
+async def get_ai_twin_summary(city_name: str, price: float = 8.0, max_points: int = SUMMARY_READINGS,
+                              limit: int = SUMMARY_READINGS, accept: Optional[str] = Header(None)):
+    """
+    A consolidated endpoint to provide all data for the AI Twin Command Center. The power trend
+    covers every buffered reading downsampled to ``max_points``; ``raw_readings`` holds the newest
+    ``limit`` rows, continued by ``GET /api/live-readings?cursor=<raw_readings_next_cursor>``.
+    The reading tables can be sent column-wise; see ``_tabular_response``.
+    """
+    _check_series_params(max_points=max_points, limit=limit)
+    try:
+        predicted_power_w, model = await _predict_live_power(city_name)
+        kpis = _live_kpis(predicted_power_w, price)
 
         # Get 7-Day Forecast
         forecast_data = []
         try:
-            forecast_weather, _, _ = WeatherAPI.get_real_weather_forecast(city_name, 7)
+            forecast_weather, _, _ = await async_weather_api.get_real_weather_forecast(city_name, 7)
             if forecast_weather is not None and not forecast_weather.empty:
-                daily_predictions_w = model.predict(forecast_weather[['temperature', 'irradiance', 'humidity', 'cloud_cover']])
+                daily_predictions_w = predict_output(model, forecast_weather)
                 forecast_weather['predicted_power_mw'] = [max(0, p * 50) for p in daily_predictions_w]
                 forecast_data = forecast_weather[['date', 'predicted_power_mw']].to_dict(orient='records')
                 for item in forecast_data: item['date'] = str(item['date'])
         except Exception as forecast_error:
             print(f"Could not generate 7-day forecast: {forecast_error}")
 
-        return {
-            "city": city_name, "live_metrics": latest_data,
-            "live_power_trend": live_df[['timestamp_kolkata', 'power']].rename(columns={'timestamp_kolkata': 'time', 'power': 'actual'}).to_dict(orient='records'),
-            "prediction": { "predicted_power_mw": predicted_power_mw },
-            "performance": { "power_difference_mw": power_loss_mw, "percent_difference": power_loss_percent, "est_revenue_loss": revenue_loss_inr },
-            "impact": { "phones_charged_per_hour": phones_charged_hourly, "ev_range_added_per_hour_km": ev_km_per_hour, "co2_avoided_grams_today": co2_avoided_grams_today },
+        readings = metrics_ingester.readings()
+        trend = minmax_indices(readings['power'], max_points)
+        raw_readings, next_row = metrics_ingester.readings_before(limit=limit)
+        return _tabular_response({
+            "city": city_name, "live_metrics": kpis["live_metrics"],
+            "live_power_trend": {"time": readings['local_time'][trend], "actual": readings['power'][trend]},
+            "prediction": kpis["prediction"],
+            "performance": kpis["performance"],
+            "impact": kpis["impact"],
             "forecast_7_day": forecast_data,
-            "raw_readings": live_df.sort_values('created_at', ascending=False).to_dict(orient='records')
-        }
+            "raw_readings": {name: raw_readings[name] for name in ['created_at', 'local_time'] + METRIC_COLUMNS},
+            "raw_readings_next_cursor": encode_cursor(next_row) if next_row is not None else None
+        }, negotiate_format(accept), primary="raw_readings")
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/live-readings")
+def get_live_readings(cursor: Optional[str] = None, limit: int = SUMMARY_READINGS, accept: Optional[str] = Header(None)):
+    """Buffered live readings, newest first, ``limit`` at a time; pass ``next_cursor`` back for older ones."""
+    _check_series_params(limit=limit)
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    readings, next_row = metrics_ingester.readings_before(before, limit)
+    return _tabular_response({
+        "readings": {name: readings[name] for name in ['created_at', 'local_time'] + METRIC_COLUMNS},
+        "next_cursor": encode_cursor(next_row) if next_row is not None else None
+    }, negotiate_format(accept), primary="readings")
+
+@app.get("/api/live-anomalies")
+def get_live_anomalies(limit: int = 50):
+    """Recent anomaly events raised by the streaming detector on the live metrics feed."""
+    detector = metrics_ingester.anomaly_detector
+    if detector is None:
+        raise HTTPException(status_code=404, detail="Live anomaly detection is disabled.")
+    return {"anomalies": metrics_ingester.recent_anomalies(max(0, limit)), **detector.stats()}
+
+async def _ai_twin_update(key, new_readings):
+    """One live update for a city/tariff channel: the readings that just arrived and the refreshed KPIs."""
+    city_name, price = key
+    predicted_power_w, _ = await _predict_live_power(city_name)
+    return dict(city=city_name, **_live_kpis(predicted_power_w, price), new_readings=new_readings)
+
+# Every viewer of a city shares one channel fed by the background metrics poller
+telemetry_hub = TelemetryHub(metrics_ingester, _ai_twin_update)
+
+@app.get("/api/ai-twin-stream/{city_name}")
+async def stream_ai_twin(city_name: str, price: float = 8.0):
+    """
+    Server-sent events for the AI Twin Command Center: a ``snapshot`` on connect, then an
+    ``update`` with only the new ``metrics`` rows and refreshed KPIs whenever readings arrive.
+    """
+    try:
+        # Fail fast with a normal error response rather than an empty stream
+        await _predict_live_power(city_name)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(telemetry_hub.subscribe((city_name, price), snapshot_rows=SUMMARY_READINGS),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _tabular_response(payload, response_format, primary):
+    """
+    Encodes ``payload``, whose tables are DataFrames or column dicts, in the format picked from
+    the ``Accept`` header: JSON records by default, or columnar JSON / an Arrow IPC stream whose
+    record batch is the ``primary`` table.
+    """
+    if response_format == COLUMNAR_JSON:
+        return Response(encode_columnar_json(payload), media_type=COLUMNAR_JSON, headers={"Vary": "Accept"})
+    if response_format == ARROW_STREAM:
+        return Response(encode_arrow_stream(payload, primary), media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+    return {key: to_records(value) if is_table(value) else value for key, value in payload.items()}
+
+DEFAULT_SERIES_POINTS = 500   # chart points per series (panel) unless ``max_points`` says otherwise
+MAX_SERIES_POINTS = 5000
+MAX_ANALYZED_ROWS = int(os.environ.get("MAX_ANALYZED_ROWS", "10000"))   # cap on ``analyzed_data`` across all panels
+
+# Full analysis results behind the downsampled responses, paged through /api/analysis/{id}/rows
+analysis_results = ResultStore()
+
+def _check_series_params(max_points=None, limit=None):
+    if max_points is not None and not MIN_SERIES_POINTS <= max_points <= MAX_SERIES_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be between {MIN_SERIES_POINTS} and {MAX_SERIES_POINTS}")
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE:,}")
+
+def _analysis_detector(read_chunks, group_by=None, refit=False):
+    """
+    The detector an analysis scores with, the chunks to score, and which model that is. The
+    persisted model is used when it fits this data; otherwise a model is fitted for this request
+    on a sample of at most ``FIT_SAMPLE_ROWS`` rows and the chunks are read again. The last value
+    lists the features the persisted model needed but this data lacks, so callers learn why
+    their upload was not scored against it.
+    """
+    chunks = read_chunks()
+    first = next(chunks, None)
+    if first is None:
+        return None, iter(()), None, []
+    chunks = itertools.chain([first], chunks)
+    detector = None if (refit or group_by) else load_anomaly_detector()
+    missing_features = []
+    if detector is not None:
+        missing_features = [name for name in detector.fitted_features if name not in first.columns]
+        if not missing_features:
+            return detector, chunks, "persisted", []
+
+    features = [name for name in EnhancedAnomalyDetector.FEATURES if name in first.columns]
+    if len(features) < 2:
+        print("Warning: Insufficient features for anomaly detection.")
+        return None, chunks, None, missing_features
+    if group_by is not None and group_by not in first.columns:
+        raise ValueError(f"Cannot group anomaly models by missing column '{group_by}'.")
+    sample = sample_rows(chunks, columns=features + ([group_by] if group_by is not None else []))
+    return EnhancedAnomalyDetector(contamination=0.1, group_by=group_by).fit(sample), read_chunks(), "fitted", missing_features
+
+def _run_anomaly_analysis(read_chunks, group_by=None, refit=False, response_format=None, max_points=DEFAULT_SERIES_POINTS):
+    """
+    Scores the data from ``read_chunks`` (a callable returning a fresh iterator of DataFrame chunks)
+    one chunk at a time: each scored chunk is folded into the health report and the chart rows and
+    appended to the stored result, so peak memory stays around one chunk however large the data.
+    ``analyzed_data`` holds every anomaly plus up to ``max_points`` rows per panel, at most
+    ``MAX_ANALYZED_ROWS`` in all; every row stays pageable at ``rows_url``. ``anomaly_model`` says
+    whether the persisted model or one fitted for this request scored the data.
+    """
+    detector, chunks, anomaly_model, missing_features = _analysis_detector(read_chunks, group_by=group_by, refit=refit)
+    health = PanelHealthAccumulator()
+    chart = None
+    with analysis_results.writer() as writer:
+        for chunk in chunks:
+            scored = detector.score_anomalies(chunk) if detector is not None else chunk
+            if chart is None:
+                value_column = next((name for name in EnhancedAnomalyDetector.FEATURES if name in scored.columns), None)
+                chart = ChartRowPool(value_column, max_points, MAX_ANALYZED_ROWS, group_by='panel_id', keep_column='is_anomaly')
+            health.add(scored)
+            chart.add(scored)
+            writer.write(scored)
+    analyzed_data = chart.rows() if chart is not None else pd.DataFrame()
+    return _tabular_response({
+        "health_report": health.report(),
+        "anomaly_model": anomaly_model,
+        "missing_features": missing_features,
+        "analyzed_data": analyzed_data,
+        "analysis_id": writer.result_id,
+        "rows_url": f"/api/analysis/{writer.result_id}/rows",
+        "downsampled": len(analyzed_data) < writer.rows,
+        "total_rows": writer.rows
+    }, response_format, primary="analyzed_data")
+
+def _analyze_performance_file(source, group_by=None, refit=False, response_format=None, max_points=DEFAULT_SERIES_POINTS):
+    """Blocking half of /api/analyze-performance: chunked CSV ingestion, analysis and encoding."""
+    def read_chunks():
+        source.seek(0)
+        return iter_performance_csv(source)
+    return _run_anomaly_analysis(read_chunks, group_by=group_by, refit=refit,
+                                 response_format=response_format, max_points=max_points)
+
+def _fit_anomaly_model(source=None):
+    """Fits the shared anomaly model on a reference CSV (or sample data) and persists it."""
+    df = sample_rows(iter_performance_csv(source)) if source is not None else SolarDataGenerator.generate_realistic_data(num_panels=10, days=30)
+    EnhancedAnomalyDetector(contamination=0.1).fit(df).save(ANOMALY_MODEL_FILE)
+    anomaly_model_registry.invalidate()
+    return len(df)
+
+def _check_group_by_column(source, group_by):
+    """Rejects a ``group_by`` column the upload's header does not have; unreadable files fail later as before."""
+    try:
+        columns = pd.read_csv(source, nrows=0).columns
+    except Exception:
+        columns = None
+    finally:
+        source.seek(0)
+    if columns is not None and group_by not in columns:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by column '{group_by}'; the file has: {', '.join(map(str, columns))}")
+
 @app.post("/api/analyze-performance")
-async def analyze_uploaded_performance(file: UploadFile = File(...)):
-    """Accepts a CSV file upload, runs analysis, and returns the report."""
+async def analyze_uploaded_performance(file: UploadFile = File(...), group_by: Optional[str] = None, refit: bool = False,
+                                       max_points: int = DEFAULT_SERIES_POINTS, accept: Optional[str] = Header(None)):
+    """Accepts a CSV file upload, runs analysis, and returns the report.
+
+    Uploads are scored against the persisted anomaly model when one exists and the upload has
+    its features; otherwise one is fitted for the upload (``anomaly_model: "fitted"``) and
+    ``missing_features`` names the features it lacked. Pass ``refit=true``
+    to fit a fresh model on this upload instead, or ``group_by=panel_id`` (or any string/inverter
+    column) to fit one anomaly model per group. Send ``Accept: application/vnd.solarsmart.columnar+json``
+    or ``application/vnd.apache.arrow.stream`` for a compact column-oriented response.
+    ``analyzed_data`` keeps every anomaly and the peaks and dips of each panel's series within
+    ``max_points`` rows, capped at ``MAX_ANALYZED_ROWS`` rows overall; when ``downsampled`` is
+    true, page through every row at ``rows_url`` (``GET /api/analysis/{analysis_id}/rows``).
+    """
+    _check_series_params(max_points=max_points)
+    if group_by is not None:
+        _check_group_by_column(file.file, group_by)
     try:
-        # Analysis logic from enhanced_efficiency_page
-        df = pd.read_csv(file.file)
-        if 'panel_power' not in df.columns and 'panel_voltage' in df.columns and 'panel_current' in df.columns:
-            df['panel_power'] = df['panel_voltage'] * df['panel_current']
-        detector = EnhancedAnomalyDetector(contamination=0.1)
-        data_with_anomalies = detector.detect_anomalies(df)
-        panel_health_report = detector.analyze_panel_health(data_with_anomalies)
-        return {
-            "health_report": panel_health_report,
-            "analyzed_data": data_with_anomalies.to_dict(orient='records')
-        }
+        # Parsing, model fitting and encoding run in the threadpool so large uploads don't block the event loop
+        return await run_in_threadpool(_analyze_performance_file, file.file, group_by, refit, negotiate_format(accept), max_points)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
 
 @app.get("/api/sample-analysis")
-async def get_sample_analysis():
+async def get_sample_analysis(refit: bool = False, max_points: int = DEFAULT_SERIES_POINTS, accept: Optional[str] = Header(None)):
     """Generates realistic sample data and returns a full analysis report."""
+    _check_series_params(max_points=max_points)
     try:
         # Logic from enhanced_efficiency_page's "Generate Sample Data" option
         df = SolarDataGenerator.generate_realistic_data(num_panels=10, days=30)
-        detector = EnhancedAnomalyDetector(contamination=0.1)
-        data_with_anomalies = detector.detect_anomalies(df)
-        panel_health_report = detector.analyze_panel_health(data_with_anomalies)
-        return {
-            "health_report": panel_health_report,
-            "analyzed_data": data_with_anomalies.to_dict(orient='records')
-        }
+        return await run_in_threadpool(_run_anomaly_analysis, lambda: iter([df]), None, refit, negotiate_format(accept), max_points)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting sample analysis: {str(e)}")
 
+@app.get("/api/analysis/{analysis_id}/rows")
+def get_analysis_rows(analysis_id: str, cursor: Optional[str] = None, limit: int = 1000, accept: Optional[str] = Header(None)):
+    """Every analyzed row of a recent analysis, ``limit`` at a time; pass ``next_cursor`` back for the next page."""
+    _check_series_params(limit=limit)
+    try:
+        page = analysis_results.page(analysis_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Analysis not found or expired: {analysis_id}")
+    rows, next_cursor, total_rows = page
+    return _tabular_response({"analysis_id": analysis_id, "rows": rows, "next_cursor": next_cursor, "total_rows": total_rows},
+                             negotiate_format(accept), primary="rows")
+
+@app.post("/api/anomaly-model/fit")
+async def fit_anomaly_model(file: Optional[UploadFile] = File(None)):
+    """Fits and persists the shared anomaly model from a reference CSV, or from sample data if none is uploaded."""
+    try:
+        rows = await run_in_threadpool(_fit_anomaly_model, file.file if file is not None else None)
+        return {"status": "success", "message": f"Anomaly model fitted on {rows} readings"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fit anomaly model: {str(e)}")
+
+MAX_MONTE_CARLO_DRAWS = 2_000_000
+
 @app.post("/api/simulate-scenario")
-async def run_simulation(request: SimulationRequest):
-    """Accepts configuration parameters and returns the simulated annual output."""
+async def run_simulation(request: SimulationRequest, mode: str = "heuristic",
+                         draws: int = 100_000, seed: Optional[int] = None):
+    """Accepts configuration parameters and returns the simulated annual output.
+
+    ``mode=hourly`` runs the physics-based 8,760-hour simulation and adds monthly and hourly output.
+    ``mode=monte_carlo`` samples ``draws`` uncertain years and adds P50/P90/P99 and a histogram.
+    """
+    if mode not in ("heuristic", "hourly", "monte_carlo"):
+        raise HTTPException(status_code=400, detail=f"Unknown simulation mode: {mode}")
+    if mode == "monte_carlo" and not 1 <= draws <= MAX_MONTE_CARLO_DRAWS:
+        raise HTTPException(status_code=400, detail=f"draws must be between 1 and {MAX_MONTE_CARLO_DRAWS:,}")
     try:
+        if mode == "monte_carlo":
+            # Large draw counts take hundreds of milliseconds, so sampling runs in the threadpool
+            distribution = await run_in_threadpool(simulate_yield_distribution, **request.model_dump(), draws=draws, seed=seed)
+            return {
+                "annual_output_kwh": simulate_solar_output(**request.model_dump()),
+                "distribution": distribution
+            }
+        if mode == "hourly":
+            result = simulate_hourly_yield(**request.model_dump())
+            return {
+                "annual_output_kwh": result["annual_kwh"],
+                "monthly_output_kwh": result["monthly_kwh"].tolist(),
+                "hourly_output_kwh": result["hourly_kwh"].tolist()
+            }
         # Logic from simulator_page
         annual_output_kwh = simulate_solar_output(**request.model_dump())
         return {"annual_output_kwh": annual_output_kwh}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during simulation: {str(e)}")
 
-@app.post("/api/retrain-model")
+MAX_SWEEP_CONFIGURATIONS = 5_000_000
+MAX_SWEEP_OUTPUTS = 100_000   # larger sweeps return only the best configuration
+
+def _run_sweep(request):
+    """Blocking half of /api/simulate-sweep: expands the configurations and simulates them all."""
+    parts = []
+    if request.scenarios:
+        parts.append({name: np.array([getattr(s, name) for s in request.scenarios]) for name in SIMULATION_PARAMETERS})
+    if request.grid:
+        parts.append(expand_simulation_grid(**request.grid.model_dump()))
+    configs = {name: np.concatenate([p[name] for p in parts]) for name in SIMULATION_PARAMETERS}
+
+    outputs = simulate_solar_output_batch(**configs)
+    best = int(np.argmax(outputs))
+    response = {
+        "count": len(outputs),
+        "best": {
+            "index": best,
+            "configuration": {name: configs[name][best].item() for name in SIMULATION_PARAMETERS},
+            "annual_output_kwh": float(outputs[best])
+        }
+    }
+    if request.include_outputs:
+        response["annual_output_kwh"] = outputs.tolist()
+    return response
+
+@app.post("/api/simulate-sweep")
+async def run_simulation_sweep(request: SimulationSweepRequest):
+    """
+    Simulates a list of scenarios and/or the Cartesian product of a parameter grid in one vectorized pass.
+    Returns the best configuration; set ``include_outputs`` for every output, in configuration order.
+    """
+    if request.scenarios is None and request.grid is None:
+        raise HTTPException(status_code=400, detail="Provide 'scenarios', 'grid', or both.")
+    grid_size = int(np.prod([len(v) for v in request.grid.model_dump().values()])) if request.grid else 0
+    count = grid_size + len(request.scenarios or [])
+    if count == 0:
+        raise HTTPException(status_code=400, detail="Sweep contains no configurations.")
+    if count > MAX_SWEEP_CONFIGURATIONS:
+        raise HTTPException(status_code=400, detail=f"Sweep exceeds {MAX_SWEEP_CONFIGURATIONS:,} configurations.")
+    if request.include_outputs and count > MAX_SWEEP_OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"include_outputs is limited to sweeps of {MAX_SWEEP_OUTPUTS:,} configurations.")
+    try:
+        # Expansion and simulation run in the threadpool so large sweeps don't block the event loop
+        return await run_in_threadpool(_run_sweep, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred during simulation sweep: {str(e)}")
+
+@app.post("/api/retrain-model", status_code=202)
 async def retrain_ai_model(request: RetrainRequest):
-    """Retrains the AI model for a specified location."""
+    """
+    Queues a retrain of the AI model for a specified location and returns the job to poll.
+    A retrain already queued or running for the same location and backend is returned instead of a new one.
+    """
     try:
-        # Logic from train_and_save_model function
-        geolocator = Nominatim(user_agent="solar_model_trainer_api", timeout=10)
-        location_data = geolocator.geocode(request.location)
+        if request.backend is not None and request.backend not in MODEL_BACKENDS:
+            raise HTTPException(status_code=400, detail=f"Unknown model backend: {request.backend}")
+        location_data = await geocoder.geocode_async(request.location)
         if not location_data:
             raise HTTPException(status_code=404, detail="Could not find location")
-        lat, lon = location_data.latitude, location_data.longitude
-        historical_weather = WeatherAPI.get_historical_weather(lat, lon)
-        result = train_and_save_model(request.location, historical_weather)
-        if result:
-            load_model.cache_clear()
-            return {"status": "success", "message": f"Model retrained for {request.location}"}
-        else:
-            raise HTTPException(status_code=500, detail="Model training failed.")
+        job, created = await training_jobs.submit(request.location, location_data.latitude, location_data.longitude,
+                                                  backend=request.backend)
+        return dict(job.to_dict(), created=created, status_url=f"/api/retrain-model/{job.job_id}")
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/retrain-model/{job_id}")
+def get_retrain_job(job_id: str):
+    """Status, progress, stage timings and result of a retraining job."""
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job: {job_id}")
+    return job.to_dict()
@@ -9,7 +9,7 @@ import { useCity } from '../context/CityContext';
 
 // --- TypeScript Interfaces for our API Data ---
 interface LiveMetrics { voltage: number; current: number; temperature: number; humidity: number; timestamp: string; }
-interface RawReading { created_at: string; voltage: number; current: number; power: number; temperature: number; }
+interface RawReading { created_at: string; local_time: string; voltage: number; current: number; power: number; temperature: number; }
 interface AITwinSummary {
   city: string;
   live_metrics: LiveMetrics;
@@ -20,6 +20,10 @@ interface AITwinSummary {
   forecast_7_day: { date: string; predicted_power_mw: number }[];
   raw_readings: RawReading[];
 }
+type LiveUpdate = Pick<AITwinSummary, 'city' | 'live_metrics' | 'prediction' | 'performance' | 'impact'> & { new_readings: RawReading[] };
+
+const API_BASE = 'http://127.0.0.1:8000';
+const MAX_READINGS = 200;
 
 const AITwinCenterPage: React.FC = () => {
   const { activeCity } = useCity();
@@ -29,20 +33,48 @@ const AITwinCenterPage: React.FC = () => {
   const [isRefreshing, setIsRefreshing] = useState(false);
 
   useEffect(() => {
+    if (!activeCity) return;
+    let stream: EventSource | null = null;
+    let cancelled = false;
+
+    // Merges a pushed update: KPIs are replaced, readings newer than the ones held are appended
+    const applyUpdate = (event: MessageEvent) => {
+      const update: LiveUpdate = JSON.parse(event.data);
+      setSummary(prev => {
+        if (!prev) return prev;
+        const newest = prev.raw_readings.length > 0 ? prev.raw_readings[0].created_at : '';
+        const fresh = update.new_readings.filter(r => r.created_at > newest);
+        return {
+          ...prev,
+          live_metrics: update.live_metrics,
+          prediction: update.prediction,
+          performance: update.performance,
+          impact: update.impact,
+          live_power_trend: [...prev.live_power_trend, ...fresh.map(r => ({ time: r.local_time, actual: r.power }))].slice(-MAX_READINGS),
+          raw_readings: [...fresh.reverse(), ...prev.raw_readings].slice(0, MAX_READINGS),
+        };
+      });
+      setIsRefreshing(false);
+    };
+
     const fetchData = async () => {
-      if (!activeCity) return;
-      
       // It's a background refresh if we already have data
       if (summary !== null) {
         setIsRefreshing(true);
       }
-      
+
       try {
-        const response = await fetch(`http://127.0.0.1:8000/api/ai-twin-summary/${activeCity}`);
+        const response = await fetch(`${API_BASE}/api/ai-twin-summary/${activeCity}`);
         if (!response.ok) throw new Error('Failed to fetch AI Twin data');
         const data: AITwinSummary = await response.json();
+        if (cancelled) return;
         setSummary(data);
         setError(null);
+
+        // New readings and KPIs are pushed by the server from here on
+        stream = new EventSource(`${API_BASE}/api/ai-twin-stream/${encodeURIComponent(activeCity)}`);
+        stream.addEventListener('snapshot', applyUpdate);
+        stream.addEventListener('update', applyUpdate);
       } catch (e) {
         setError("Failed to fetch data. Is the backend running?");
         console.error(e);
@@ -52,8 +84,10 @@ const AITwinCenterPage: React.FC = () => {
     };
 
     fetchData();
-    const interval = setInterval(fetchData, 10000); // Auto-refresh logic
-    return () => clearInterval(interval);
+    return () => {
+      cancelled = true;
+      stream?.close();
+    };
   }, [activeCity]);
 
   if (error) return <GlassCard><div className="text-center text-red-500 p-8">{error}</div></GlassCard>;
@@ -11,6 +11,20 @@ import { useCity } from '../context/CityContext';
 interface WeatherPoint { date: string; temperature: number; irradiance: number; humidity: number; cloud_cover: number; }
 interface EnergyPoint { date: string; predicted_output_kwh: number; }
 interface ForecastData { location: string; weather_data: WeatherPoint[]; energy_forecast: EnergyPoint[]; }
+interface TrainingJob { job_id: string; status: string; error: string | null; }
+
+const API_BASE = 'http://127.0.0.1:8000';
+
+// Retraining runs as a background job; poll its status until it finishes
+const waitForTrainingJob = async (job: TrainingJob): Promise<TrainingJob> => {
+  while (job.status !== 'succeeded' && job.status !== 'failed') {
+    await new Promise(resolve => setTimeout(resolve, 1000));
+    const response = await fetch(`${API_BASE}/api/retrain-model/${job.job_id}`);
+    if (!response.ok) throw new Error('Failed to check AI model training status.');
+    job = await response.json();
+  }
+  return job;
+};
 
 const PerformanceForecastingPage: React.FC = () => {
   const { setActiveCity } = useCity();
@@ -38,16 +52,18 @@ const PerformanceForecastingPage: React.FC = () => {
 
     try {
       // Logic to retrain model and get forecast
-      const retrainResponse = await fetch('http://127.0.0.1:8000/api/retrain-model', {
+      const retrainResponse = await fetch(`${API_BASE}/api/retrain-model`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ location: cityInput })
       });
       if (!retrainResponse.ok) throw new Error('Failed to retrain AI model.');
+      const trainingJob = await waitForTrainingJob(await retrainResponse.json());
+      if (trainingJob.status === 'failed') throw new Error(`Failed to retrain AI model: ${trainingJob.error}`);
       
       setActiveCity(cityInput);
       
-      const forecastResponse = await fetch('http://127.0.0.1:8000/api/forecast', {
+      const forecastResponse = await fetch(`${API_BASE}/api/forecast`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(forecastPayload)
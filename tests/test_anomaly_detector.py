@@ -0,0 +1,32 @@
+# File: tests/test_anomaly_detector.py
+
+import numpy as np
+from core.anomaly_detector import EnhancedAnomalyDetector
+from core.data_generator import SolarDataGenerator
+
+def test_grouped_model_survives_save_and_load(tmp_path):
+    data = SolarDataGenerator.generate_realistic_data(num_panels=4, days=10, seed=3)
+    fitted = EnhancedAnomalyDetector(group_by='panel_id', n_jobs=1, min_group_size=20).fit(data)
+    path = tmp_path / "anomaly_model.joblib"
+    fitted.save(path)
+
+    loaded = EnhancedAnomalyDetector.load(path)
+    assert loaded.group_by == 'panel_id'
+    assert loaded.min_group_size == 20
+    assert set(loaded.group_models) == set(fitted.group_models)
+    np.testing.assert_array_equal(loaded.score_anomalies(data)['anomaly_score'],
+                                  fitted.score_anomalies(data)['anomaly_score'])
+    assert [p.name for p in tmp_path.iterdir()] == ["anomaly_model.joblib"]
+
+def test_grouped_detection_falls_back_to_the_fleet_model_for_small_groups():
+    data = SolarDataGenerator.generate_realistic_data(num_panels=3, days=10, seed=5)
+    # Panel_03 keeps only a handful of rows, too few for a model of its own
+    data = data[(data['panel_id'] != 'Panel_03') | (data.groupby('panel_id', observed=True).cumcount() < 5)]
+    detector = EnhancedAnomalyDetector(group_by='panel_id', n_jobs=1, min_group_size=20)
+    scored = detector.detect_anomalies(data)
+
+    assert set(detector.group_models) == {'Panel_01', 'Panel_02'}
+    assert scored.index.equals(data.index)
+    small = (scored['panel_id'] == 'Panel_03').to_numpy()
+    fleet = EnhancedAnomalyDetector().fit(data).score_anomalies(data)
+    np.testing.assert_array_equal(scored['anomaly_score'].to_numpy()[small], fleet['anomaly_score'].to_numpy()[small])
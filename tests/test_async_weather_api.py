@@ -0,0 +1,54 @@
+# File: tests/test_async_weather_api.py
+
+import asyncio
+import httpx
+from api.async_weather_api import AsyncWeatherAPI
+from api.weather_api import current_weather_cache
+
+CURRENT = {"current": {"temperature_2m": 31.5, "relative_humidity_2m": 48, "cloud_cover": 12, "shortwave_radiation": 640}}
+
+def test_base_urls_are_read_when_the_client_is_created(monkeypatch):
+    monkeypatch.setenv("OPEN_METEO_FORECAST_URL", "http://weather.test/v1/forecast")
+    monkeypatch.setenv("OPEN_METEO_ARCHIVE_URL", "http://weather.test/v1/archive")
+    api = AsyncWeatherAPI()
+    assert api.forecast_url == "http://weather.test/v1/forecast"
+    assert api.archive_url == "http://weather.test/v1/archive"
+
+def test_current_weather_retries_transient_failures():
+    current_weather_cache.clear()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json=CURRENT)
+
+    api = AsyncWeatherAPI(forecast_url="http://weather.test/v1/forecast", backoff_base=0,
+                          transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        try:
+            return await api.get_current_weather(21.15, 79.08)
+        finally:
+            await api.aclose()
+
+    weather = asyncio.run(scenario())
+    assert len(requests) == 2
+    assert requests[-1].url.host == "weather.test"
+    assert requests[-1].url.params["latitude"] == "21.15"
+    assert weather.iloc[0].to_dict() == {"temperature": 31.5, "irradiance": 640, "humidity": 48, "cloud_cover": 12}
+
+def test_current_weather_is_none_when_upstream_keeps_failing():
+    current_weather_cache.clear()
+    api = AsyncWeatherAPI(forecast_url="http://weather.test/v1/forecast", max_retries=1, backoff_base=0,
+                          transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+
+    async def scenario():
+        try:
+            return await api.get_current_weather(21.15, 79.08)
+        finally:
+            await api.aclose()
+
+    assert asyncio.run(scenario()) is None
+    assert (21.15, 79.08) not in current_weather_cache
@@ -0,0 +1,40 @@
+# File: tests/test_caching.py
+
+import asyncio
+import pandas as pd
+from core.caching import SingleFlightCache
+
+def test_cancelled_caller_does_not_fail_coalesced_waiters():
+    cache = SingleFlightCache('test-cancel', ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def scenario():
+        first = asyncio.create_task(cache.aget_or_load('key', loader))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.aget_or_load('key', loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await waiter, first
+
+    value, first = asyncio.run(scenario())
+    assert value == 42
+    assert first.cancelled()
+    assert calls == [1]
+    assert 'key' in cache
+
+def test_callers_get_their_own_copy_of_cached_frames():
+    cache = SingleFlightCache('test-copy', ttl=60)
+    loader = lambda: (pd.DataFrame({'a': [1, 2]}), 21.15)
+
+    frame, _ = cache.get_or_load('key', loader)
+    frame['b'] = 0
+    frame.loc[0, 'a'] = 99
+    again, latitude = cache.get_or_load('key', loader)
+    assert list(again.columns) == ['a']
+    assert again['a'].tolist() == [1, 2]
+    assert latitude == 21.15
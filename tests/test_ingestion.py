@@ -0,0 +1,46 @@
+# File: tests/test_ingestion.py
+
+import pandas as pd
+import pytest
+from core.anomaly_detector import EnhancedAnomalyDetector, PanelHealthAccumulator
+from core.data_generator import SolarDataGenerator
+from core.ingestion import iter_performance_csv, sample_rows
+
+@pytest.fixture(scope="module")
+def performance_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("uploads") / "performance.csv"
+    SolarDataGenerator.generate_realistic_data(num_panels=10, days=30, seed=7).to_csv(path, index=False)
+    return path
+
+def test_chunked_float32_health_report_matches_float64(performance_csv):
+    """The chunked float32 path must report what a whole-file float64 analysis reports."""
+    reference = pd.read_csv(performance_csv)
+    detector = EnhancedAnomalyDetector(contamination=0.1)
+    expected = detector.analyze_panel_health(detector.detect_anomalies(reference))
+
+    model = EnhancedAnomalyDetector(contamination=0.1).fit(sample_rows(iter_performance_csv(performance_csv, chunksize=1000)))
+    health = PanelHealthAccumulator()
+    for chunk in iter_performance_csv(performance_csv, chunksize=1000):
+        health.add(model.score_anomalies(chunk))
+    actual = health.report()
+
+    assert list(actual) == list(expected)
+    for panel, stats in expected.items():
+        assert actual[panel]['health_status'] == stats['health_status']
+        assert actual[panel]['total_readings'] == stats['total_readings']
+        assert actual[panel]['anomaly_count'] == pytest.approx(stats['anomaly_count'], abs=2)
+        for name in ('avg_output', 'output_stability', 'voltage_stability'):
+            assert actual[panel][name] == pytest.approx(stats[name], rel=1e-5)
+
+def test_sample_rows_keeps_small_inputs_whole_and_in_order(performance_csv):
+    whole = pd.read_csv(performance_csv)
+    sample = sample_rows(iter_performance_csv(performance_csv, chunksize=700))
+    assert len(sample) == len(whole)
+    assert isinstance(sample['panel_id'].dtype, pd.CategoricalDtype)
+    assert sample['panel_id'].astype(str).tolist() == whole['panel_id'].tolist()
+
+def test_sample_rows_is_bounded(performance_csv):
+    sample = sample_rows(iter_performance_csv(performance_csv, chunksize=700), max_rows=500, columns=['panel_id', 'energy_output'])
+    assert len(sample) == 500
+    assert list(sample.columns) == ['panel_id', 'energy_output']
+    assert sample['panel_id'].nunique() == 10
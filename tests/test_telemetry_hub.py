@@ -0,0 +1,94 @@
+# File: tests/test_telemetry_hub.py
+
+import asyncio
+import json
+import pandas as pd
+from core.telemetry_hub import TelemetryHub
+from db.metrics_ingester import MetricsIngester
+
+class FakeMetricsSource:
+    """Stands in for the Supabase ``metrics`` table: rows after the ``(created_at, id)`` position ``since``, oldest first."""
+    def __init__(self):
+        self.rows = []
+
+    def add(self, count):
+        start = pd.Timestamp("2025-06-01 06:00", tz="UTC") + pd.Timedelta(minutes=len(self.rows))
+        for i in range(count):
+            created_at = (start + pd.Timedelta(minutes=i)).isoformat()
+            self.rows.append({"id": len(self.rows) + 1, "created_at": created_at, "power": 0.1 * (len(self.rows) + 1), "voltage": 24.0,
+                              "current": 4.0, "temperature": 30.0, "humidity": 60.0})
+
+    def __call__(self, table, since, limit):
+        newer = [row for row in self.rows if since is None or (row["created_at"], row["id"]) > since]
+        return newer[-limit:] if since is None else newer[:limit]
+
+def parse(message):
+    event, data = message.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+def test_subscribers_share_one_update_per_batch():
+    source = FakeMetricsSource()
+    source.add(5)
+    ingester = MetricsIngester(fetch_rows=source, capacity=100, page_size=10)
+    ingester.poll()
+    builds = []
+
+    async def build_update(key, new_readings):
+        builds.append(len(new_readings))
+        return {"key": list(key), "new_readings": new_readings}
+
+    async def scenario():
+        hub = TelemetryHub(ingester, build_update)
+        first, second = hub.subscribe(("Pune", 8.0), snapshot_rows=3), hub.subscribe(("Pune", 8.0), snapshot_rows=3)
+        snapshots = [parse(await stream.__anext__()) for stream in (first, second)]
+        assert hub.subscriber_counts() == {"('Pune', 8.0)": 2}
+
+        source.add(2)
+        ingester.poll()
+        ingester._notify()
+        updates = [parse(await asyncio.wait_for(stream.__anext__(), 1)) for stream in (first, second)]
+        for stream in (first, second):
+            await stream.aclose()
+        assert hub.subscriber_counts() == {}
+        return snapshots, updates
+
+    snapshots, updates = asyncio.run(scenario())
+    assert [event for event, _ in snapshots] == ["snapshot", "snapshot"]
+    assert len(snapshots[0][1]["new_readings"]) == 3
+    assert updates[0] == updates[1]
+    event, update = updates[0]
+    assert event == "update"
+    assert [row["created_at"] for row in update["new_readings"]] == [row["created_at"] for row in source.rows[-2:]]
+    # One build per snapshot, then one shared build for the batch
+    assert builds == [3, 3, 2]
+
+def test_readings_carry_local_time():
+    source = FakeMetricsSource()
+    source.add(2)
+    ingester = MetricsIngester(fetch_rows=source, capacity=10)
+    ingester.poll()
+    reading = ingester.records(1)[0]
+    assert reading["created_at"] == "2025-06-01T06:01:00+00:00"
+    assert reading["local_time"] == "2025-06-01T11:31:00+05:30"
+
+def test_paging_keeps_rows_that_share_a_timestamp():
+    source = FakeMetricsSource()
+    source.add(1)
+    ingester = MetricsIngester(fetch_rows=source, capacity=100, page_size=3)
+    ingester.poll()
+    # Seven readings logged in the same instant span three pages
+    source.add(7)
+    for row in source.rows[1:]:
+        row["created_at"] = source.rows[1]["created_at"]
+    assert ingester.poll() == 7
+    assert ingester.rows_ingested == 8
+    assert ingester.readings()["power"].tolist() == [row["power"] for row in source.rows]
+
+def test_energy_today_starts_at_local_midnight():
+    midnight = pd.Timestamp.now(tz="Asia/Kolkata").normalize()
+    rows = [{"id": i + 1, "created_at": (midnight + offset).tz_convert("UTC").isoformat(), "power": 2.0}
+            for i, offset in enumerate(pd.to_timedelta(["-1h", "30min", "60min"]))]
+    ingester = MetricsIngester(fetch_rows=lambda table, since, limit: rows if since is None else [], capacity=10)
+    ingester.poll()
+    # 00:00-00:30 and 00:30-01:00 at 2 kW; the overnight gap before midnight belongs to yesterday
+    assert ingester.energy_today_mwh() == 2.0 * 1000 * 1.0
@@ -0,0 +1,27 @@
+# File: tests/test_training_jobs.py
+
+import asyncio
+from core.training_jobs import TrainingJobQueue, TrainingJobStore, FAILED
+
+def test_long_waits_are_not_taken_for_abandoned_jobs(tmp_path):
+    async def load_weather(lat, lon):
+        await asyncio.sleep(0.5)
+        raise RuntimeError("Weather archive unavailable.")
+
+    store = TrainingJobStore(db_path=str(tmp_path / "jobs.sqlite3"), stale_after=0.2)
+    queue = TrainingJobQueue(load_weather, store=store, heartbeat_interval=0.05)
+
+    async def scenario():
+        job, created = await queue.submit("Pune", 18.52, 73.86)
+        # Well past stale_after, but the job has kept marking itself alive
+        await asyncio.sleep(0.35)
+        again, created_again = await queue.submit("Pune", 18.52, 73.86)
+        await asyncio.gather(*queue._tasks)
+        return job, created, again, created_again
+
+    job, created, again, created_again = asyncio.run(scenario())
+    assert created and not created_again
+    assert again.job_id == job.job_id
+    finished = queue.get(job.job_id)
+    assert finished.status == FAILED
+    assert finished.error == "Weather archive unavailable."
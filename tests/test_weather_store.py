@@ -0,0 +1,28 @@
+# File: tests/test_weather_store.py
+
+import os
+from datetime import date, timedelta
+import pandas as pd
+from api.weather_store import WeatherStore
+
+def hourly_rows(start, hours):
+    dates = pd.date_range(start, periods=hours, freq="h")
+    return pd.DataFrame({"date": dates, "temperature": 25.0, "humidity": 60.0, "irradiance": 500.0, "cloud_cover": 20.0})
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / "weather.sqlite3"
+    store = WeatherStore(db_path=str(path))
+    assert not path.exists()
+    assert store.missing_ranges(21.15, 79.08, date(2025, 1, 1), date(2025, 1, 2)) == [(date(2025, 1, 1), date(2025, 1, 2))]
+    assert os.path.exists(path)
+
+def test_hours_that_have_not_happened_are_never_stored(tmp_path):
+    store = WeatherStore(db_path=str(tmp_path / "weather.sqlite3"))
+    yesterday = date.today() - timedelta(days=1)
+    # Yesterday in full plus the whole of tomorrow, as an archive response reaching past now would hold
+    store.save(21.15, 79.08, hourly_rows(pd.Timestamp(yesterday), 72))
+
+    stored = store.load(21.15, 79.08, yesterday, yesterday + timedelta(days=2))
+    assert stored['date'].max() <= pd.Timestamp.now(tz='UTC').tz_localize(None)
+    assert store.missing_ranges(21.15, 79.08, yesterday, yesterday) == []
+    assert store.missing_ranges(21.15, 79.08, yesterday + timedelta(days=2), yesterday + timedelta(days=2)) != []
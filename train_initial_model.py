@@ -32,7 +32,7 @@ def create_initial_model(location: str, lat: float, lon: float):
     # Step 3: Train and save the model
     print("Step 3: Training AI model and saving to 'solar_model.joblib'...")
     
-    result = train_and_save_model(location, historical_weather)
+    result = train_and_save_model(location, historical_weather, set_default=True)
     
     if result and os.path.exists('solar_model.joblib'):
         print("\n--- SUCCESS! ---")